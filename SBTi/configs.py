@@ -64,6 +64,13 @@ class ColumnsConfig:
     BASEYEAR_GHG_S3 = "base_year_ghg_s3"
     REGION = "region"
     ENGAGEMENT_TARGET = "engagement_target"
+    PORTFOLIO_ID = "portfolio_id"
+    PARENT_PORTFOLIO_ID = "parent_portfolio_id"
+    CHILD_PORTFOLIO_ID = "child_portfolio_id"
+    HIERARCHY_WEIGHT = "weight"
+    REPORTING_DATE = "reporting_date"
+    HOLDINGS_DATE = "holdings_date"
+    GRID_MARKER = "grid_marker"
 
     # SR15 mapping columns
     PARAM = "param"
@@ -73,11 +80,23 @@ class ColumnsConfig:
     WEIGHTED_TEMPERATURE_SCORE = "weighted_temperature_score"
     CONTRIBUTION_RELATIVE = "contribution_relative"
     CONTRIBUTION = "contribution"
+    GROUP = "group"
+    SCORE = "score"
+    PROPORTION = "proportion"
+    INFLUENCE_PERCENTAGE = "influence_percentage"
+    CONTRIBUTIONS_START = "contributions_start"
+    CONTRIBUTIONS_STOP = "contributions_stop"
+    PORTFOLIO_WEIGHT = "portfolio_weight"
+    NUMBER_OF_COMPANIES = "number_of_companies"
 
 
 class PortfolioAggregationConfig:
     COLS = ColumnsConfig
 
+    # The company name of the contribution that sums up the companies outside the top contributors. Its company ID is
+    # empty (None), which tells it apart from a company with the same name.
+    OTHER_CONTRIBUTIONS = "Other"
+
 
 class TemperatureScoreConfig(PortfolioAggregationConfig):
 
@@ -1,5 +1,6 @@
 from typing import List, Type, Dict, Tuple, Optional
 import requests
+import numpy as np
 import pandas as pd
 import warnings
 import datetime
@@ -54,6 +55,8 @@ class SBTi:
         
         # Detect and convert column format if needed
         self.targets = self._ensure_compatible_format(self.targets)
+        # The unfiltered CTA file, for the validity at other cutoff dates than the one of this instance
+        self._all_targets = self.targets
 
         # Apply date filter if cutoff_date is provided
         if self.cutoff_date is not None:
@@ -235,6 +238,98 @@ class SBTi:
         
         return df_nt_targets
 
+    def _get_first_occurrences(self, values: pd.Series, mask: np.ndarray) -> np.ndarray:
+        """
+        Mark the first row of each value among the rows in a mask, for a number of masks (one per column) at once. This
+        is what drop_duplicates(keep='first') keeps of the masked rows, where missing values are duplicates of each other.
+
+        :param values: The values to deduplicate on
+        :param mask: The rows to deduplicate, one column per mask
+        :return: The rows that are kept, one column per mask
+        """
+        codes = pd.factorize(values, use_na_sentinel=False)[0]
+        order = np.argsort(codes, kind="stable")
+        sorted_mask = mask[order]
+        counts = np.cumsum(sorted_mask, axis=0)
+
+        # Subtract the counts of the values before the group, so the counts start at zero for every value
+        sorted_codes = codes[order]
+        is_start = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+        group_starts = np.maximum.accumulate(np.where(is_start, np.arange(len(codes)), 0))
+        counts_before = np.vstack([np.zeros((1, mask.shape[1]), dtype=counts.dtype), counts])[group_starts]
+
+        first_occurrences = np.empty_like(mask)
+        first_occurrences[order] = sorted_mask & (counts - counts_before == 1)
+        return first_occurrences
+
+    def get_sbti_validity(
+        self,
+        companies: List[IDataProviderCompany],
+        id_map: Dict[str, Tuple[str, str]],
+        cutoff_dates: List[datetime.datetime],
+    ) -> pd.DataFrame:
+        """
+        Get whether the companies had a SBTi validated target at a number of cutoff dates, from a single loaded CTA file.
+        This gives the same results as creating an SBTi instance with each cutoff date and calling get_companies (also
+        for cutoff dates after the one of this instance, as the unfiltered CTA file is used), but the CTA file is only
+        loaded once and all companies and dates are matched in one vectorized pass: the publication
+        date of every row of the CTA file is compared to all cutoff dates at once, and the filtering and deduplication
+        of filter_cta_file are applied to all cutoff dates at once.
+
+        :param companies: A list of IDataProviderCompany instances
+        :param id_map: A map from company id to a tuple of (ISIN, LEI)
+        :param cutoff_dates: The cutoff dates
+        :return: A company x date matrix of the SBTi validity, one row per company id and one column per cutoff date
+        """
+        cutoff_dates = pd.DatetimeIndex(cutoff_dates)
+        targets = self._all_targets
+        if self.c.COL_DATE_PUBLISHED in targets.columns:
+            published = pd.to_datetime(targets[self.c.COL_DATE_PUBLISHED], errors='coerce')
+            # The rows that are published on or before each cutoff date (never for a missing date)
+            published_by = published.to_numpy()[:, np.newaxis] <= cutoff_dates.to_numpy()[np.newaxis, :]
+        else:
+            print(f"Warning: Date column '{self.c.COL_DATE_PUBLISHED}' not found. Skipping date filter.")
+            published_by = np.ones((len(targets), len(cutoff_dates)), dtype=bool)
+
+        # The rows that filter_cta_file keeps at each cutoff date
+        is_target = (
+            (targets[self.c.COL_ACTION] == self.c.VALUE_ACTION_TARGET)
+            & (targets[self.c.COL_TARGET] == self.c.VALUE_TARGET_SET)
+        ).to_numpy()
+        kept = published_by & is_target[:, np.newaxis]
+        for identifier_col in [self.c.COL_COMPANY_LEI, self.c.COL_COMPANY_ISIN, self.c.COL_COMPANY_NAME]:
+            if identifier_col in targets.columns:
+                kept = self._get_first_occurrences(targets[identifier_col], kept)
+
+        def get_identifier_validity(identifiers: pd.Series, company_identifiers: List[Optional[str]]) -> np.ndarray:
+            # Whether any of the kept rows has the identifier of the company, at each cutoff date
+            codes, uniques = pd.factorize(identifiers)
+            # The last row is for the companies whose identifier isn't in the CTA file (or is unusable)
+            identifier_validity = np.zeros((len(uniques) + 1, len(cutoff_dates)), dtype=bool)
+            np.logical_or.at(identifier_validity, codes[codes >= 0], kept[codes >= 0])
+            company_codes = pd.Index(uniques).get_indexer(company_identifiers)
+            return identifier_validity[company_codes]
+
+        leis, isins, names = [], [], []
+        for company in companies:
+            isin, lei = id_map.get(company.company_id, (None, None))
+            leis.append(lei if lei and not lei.lower() == 'nan' and len(str(lei)) > 3 else None)
+            isins.append(isin if isin and not isin.lower() == 'nan' else None)
+            names.append(company.company_name.lower() if company.company_name else None)
+
+        validity = np.zeros((len(companies), len(cutoff_dates)), dtype=bool)
+        if len(companies) > 0:
+            validity = (
+                get_identifier_validity(targets[self.c.COL_COMPANY_LEI], leis)
+                | get_identifier_validity(targets[self.c.COL_COMPANY_ISIN], isins)
+                | get_identifier_validity(targets[self.c.COL_COMPANY_NAME].str.lower(), names)
+            )
+        return pd.DataFrame(
+            validity,
+            index=pd.Index([company.company_id for company in companies], name="company_id"),
+            columns=cutoff_dates,
+        )
+
     def get_company_targets(self, company_name: str = None, isin: str = None, lei: str = None):
         """
         Get all targets for a specific company.
@@ -0,0 +1,330 @@
+"""
+This module caches the static input tables (the SR15 mapping and the regression model summary), so they only have to be
+parsed once per process, no matter how many TemperatureScore instances are created.
+
+To speed up cold starts, the Excel files can also be converted into binary snapshots (.npz files next to the Excel
+files), which are used instead of the Excel files as long as their content hash still matches. To (re)build the
+snapshots run:
+
+    python -c "from SBTi.input_tables import build_snapshots; build_snapshots()"
+"""
+import hashlib
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from SBTi.configs import ColumnsConfig, TemperatureScoreConfig
+
+SNAPSHOT_EXTENSION = ".npz"
+SNAPSHOT_COLUMNS = "__columns__"
+SNAPSHOT_HASH = "__hash__"
+
+
+def copy_on_write_enabled() -> bool:
+    """
+    Check whether pandas uses Copy-on-Write, in which case a shallow copy of a data frame can't change the original.
+
+    :return: True if Copy-on-Write is enabled
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def get_file_hash(path: str) -> str:
+    """
+    Get the content hash of a file.
+
+    :param path: The path to the file
+    :return: The SHA-256 hash of the file's content
+    """
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def get_snapshot_path(path: str) -> str:
+    """
+    Get the path of the binary snapshot that belongs to an Excel file.
+
+    :param path: The path to the Excel file
+    :return: The path to the snapshot
+    """
+    return os.path.splitext(path)[0] + SNAPSHOT_EXTENSION
+
+
+def build_snapshot(path: str) -> str:
+    """
+    Convert an Excel file into a binary snapshot. Every column is stored as a separate array, text columns as unicode
+    arrays (with a separate mask for the empty cells), so the snapshot can be loaded without pickle.
+
+    :param path: The path to the Excel file
+    :return: The path to the snapshot
+    """
+    table = pd.read_excel(path, header=0)
+    arrays = {
+        SNAPSHOT_COLUMNS: np.array([str(column) for column in table.columns]),
+        SNAPSHOT_HASH: np.array(get_file_hash(path)),
+    }
+    for i, column in enumerate(table.columns):
+        values = table[column]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            arrays["c{}".format(i)] = values.to_numpy()
+        else:
+            arrays["c{}".format(i)] = values.fillna("").astype(str).to_numpy(dtype=str)
+            arrays["n{}".format(i)] = values.isnull().to_numpy()
+
+    snapshot_path = get_snapshot_path(path)
+    with open(snapshot_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+    return snapshot_path
+
+
+def build_snapshots(paths: Optional[List[str]] = None) -> List[str]:
+    """
+    Convert the input tables into binary snapshots.
+
+    :param paths: The paths to the Excel files (defaults to the SR15 mapping and the regression model summary)
+    :return: The paths to the snapshots
+    """
+    if paths is None:
+        paths = [
+            TemperatureScoreConfig.FILE_SR15_MAPPING,
+            TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY,
+        ]
+    return [build_snapshot(path) for path in paths]
+
+
+def read_snapshot(path: str) -> Optional[pd.DataFrame]:
+    """
+    Read the binary snapshot of an Excel file.
+
+    :param path: The path to the Excel file
+    :return: The table, or None if there's no snapshot or the snapshot doesn't match the Excel file anymore
+    """
+    snapshot_path = get_snapshot_path(path)
+    if not os.path.isfile(snapshot_path):
+        return None
+    with np.load(snapshot_path, allow_pickle=False) as snapshot:
+        if str(snapshot[SNAPSHOT_HASH]) != get_file_hash(path):
+            return None
+        columns = {}
+        for i, column in enumerate(snapshot[SNAPSHOT_COLUMNS]):
+            values = snapshot["c{}".format(i)]
+            if "n{}".format(i) in snapshot.files:
+                values = values.astype(object)
+                values[snapshot["n{}".format(i)]] = np.nan
+            columns[str(column)] = values
+    return pd.DataFrame(columns)
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """
+    Read an input table, from its binary snapshot if there's an up-to-date one and from the Excel file otherwise.
+
+    :param path: The path to the Excel file
+    :return: The table
+    """
+    table = read_snapshot(path)
+    if table is None:
+        table = pd.read_excel(path, header=0)
+    return table
+
+
+class RegressionModelIndex:
+    """
+    An index on the regression model summary of a single model, which maps (SR15 variable, slope) pairs onto the row
+    that holds their regression parameter and intercept. This allows attaching the coefficients to many targets at once
+    by gathering on integer codes, instead of filtering or merging the regression model.
+
+    :param regression_model: The regression model summary, filtered on a single model
+    :param variable_column: The column that contains the SR15 variable
+    :param slope_column: The column that contains the slope
+    """
+
+    def __init__(
+        self,
+        regression_model: pd.DataFrame,
+        variable_column: str = ColumnsConfig.VARIABLE,
+        slope_column: str = ColumnsConfig.SLOPE,
+    ):
+        self.variables = pd.Index(regression_model[variable_column].unique())
+        self.slopes = pd.Index(regression_model[slope_column].unique())
+        self.positions = np.full((len(self.variables), len(self.slopes)), -1)
+
+        variable_codes = self.variables.get_indexer(regression_model[variable_column])
+        slope_codes = self.slopes.get_indexer(regression_model[slope_column])
+        if (
+            pd.MultiIndex.from_arrays([variable_codes, slope_codes])
+            .duplicated()
+            .any()
+        ):
+            # There should never be more than one potential mapping
+            raise ValueError(
+                "There is more than one potential regression parameter for this SR15 goal."
+            )
+        self.positions[variable_codes, slope_codes] = np.arange(len(regression_model))
+        # The index is shared through the cache, so it shouldn't be changed
+        self.positions.flags.writeable = False
+
+    def get_positions(self, variables: pd.Series, slopes: pd.Series) -> np.ndarray:
+        """
+        Get the positions of the regression parameters for a number of (SR15 variable, slope) pairs.
+
+        :param variables: The SR15 variables
+        :param slopes: The slopes
+        :return: The row positions in the regression model summary, -1 if there's no regression parameter for a pair
+        """
+        variable_codes = self.variables.get_indexer(variables)
+        slope_codes = self.slopes.get_indexer(slopes)
+        found = (variable_codes >= 0) & (slope_codes >= 0)
+        positions = np.full(len(variable_codes), -1)
+        positions[found] = self.positions[variable_codes[found], slope_codes[found]]
+        return positions
+
+
+class InputTableCache:
+    """
+    A thread-safe cache of the parsed input tables and the indexes built on them. The tables are keyed on their file path
+    and modification time (and the model number for the regression model), so a file that changed on disk is parsed
+    again and the tables of the older version are dropped. With Copy-on-Write the tables that are handed out share
+    their data with the cached tables, without it they're deep copies, so changing them never affects the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tables: Dict[Tuple[str, float, Hashable], Any] = {}
+
+    @staticmethod
+    def _get_file_key(path: str) -> Tuple[str, float]:
+        """
+        Get the part of the cache key that identifies a file.
+
+        :param path: The path to the file
+        :return: The real path and the modification time of the file
+        """
+        path = os.path.realpath(path)
+        return path, os.path.getmtime(path)
+
+    def _drop_stale(self, key: Tuple[str, float, Hashable]):
+        """
+        Remove the entries of older versions of a file from the cache, before an entry of its current version is added.
+
+        :param key: The cache key of the entry that's added
+        """
+        for stale_key in [
+            cached_key
+            for cached_key in self._tables
+            if cached_key[0] == key[0] and cached_key[1] != key[1]
+        ]:
+            del self._tables[stale_key]
+
+    def _get_table(
+        self, key: Tuple[str, float, Hashable], load: Callable[[], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """
+        Get a table from the cache, loading it first if it isn't cached yet.
+
+        :param key: The cache key
+        :param load: A function that loads the table
+        :return: A copy of the cached table
+        """
+        with self._lock:
+            if key not in self._tables:
+                self._drop_stale(key)
+                self._tables[key] = load()
+            return self._tables[key].copy(deep=not copy_on_write_enabled())
+
+    def get_sr15_mapping(self, path: str) -> pd.DataFrame:
+        """
+        Get the SR15 mapping table.
+
+        :param path: The path to the SR15 mapping file
+        :return: A copy of the SR15 mapping
+        """
+        file_key = self._get_file_key(path)
+        return self._get_table(
+            file_key + (None,), lambda: read_table(file_key[0])
+        )
+
+    def get_regression_model(
+        self,
+        path: str,
+        model: Optional[int] = None,
+        model_column: str = ColumnsConfig.MODEL,
+    ) -> pd.DataFrame:
+        """
+        Get the regression model summary, filtered on a single model.
+
+        :param path: The path to the regression model summary file
+        :param model: The regression model to use (None for all models)
+        :param model_column: The column that contains the model number
+        :return: A copy of the regression model summary
+        """
+        file_key = self._get_file_key(path)
+        regression_model = self._get_table(
+            file_key + (None,), lambda: read_table(file_key[0])
+        )
+        if model is None:
+            return regression_model
+        return self._get_table(
+            file_key + (model,),
+            lambda: regression_model[regression_model[model_column] == model],
+        )
+
+    def get_regression_index(
+        self,
+        path: str,
+        model: int,
+        model_column: str = ColumnsConfig.MODEL,
+        variable_column: str = ColumnsConfig.VARIABLE,
+        slope_column: str = ColumnsConfig.SLOPE,
+    ) -> RegressionModelIndex:
+        """
+        Get the index on the regression model summary of a single model. The index is built once per model.
+
+        :param path: The path to the regression model summary file
+        :param model: The regression model to use
+        :param model_column: The column that contains the model number
+        :param variable_column: The column that contains the SR15 variable
+        :param slope_column: The column that contains the slope
+        :return: The index on the regression model
+        """
+        file_key = self._get_file_key(path)
+        key = file_key + ((RegressionModelIndex, model),)
+        with self._lock:
+            if key not in self._tables:
+                self._drop_stale(key)
+                self._tables[key] = RegressionModelIndex(
+                    self.get_regression_model(path, model, model_column),
+                    variable_column,
+                    slope_column,
+                )
+            return self._tables[key]
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        Remove the tables that were parsed from a certain file from the cache, so they're parsed again the next time
+        they're requested.
+
+        :param path: The path to the file (None to clear the whole cache)
+        """
+        with self._lock:
+            if path is None:
+                self._tables.clear()
+            else:
+                path = os.path.realpath(path)
+                for key in [key for key in self._tables if key[0] == path]:
+                    del self._tables[key]
+
+
+# The process-wide cache that's shared by all TemperatureScore instances
+INPUT_TABLES = InputTableCache()
+
+
+if __name__ == "__main__":
+    for snapshot_path in build_snapshots(sys.argv[1:] or None):
+        print("Written {}".format(snapshot_path))
@@ -7,7 +7,8 @@ from pydantic import BaseModel, field_validator, model_validator, Field
 
 class AggregationContribution(BaseModel):
     company_name: str
-    company_id: str
+    # None for the contribution of the other companies, when only the top contributors are kept
+    company_id: Optional[str]
     temperature_score: float
     contribution_relative: Optional[float] = None
     contribution: Optional[float] = None
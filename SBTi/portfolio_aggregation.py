@@ -1,10 +1,20 @@
 from abc import ABC
 from enum import Enum
-from typing import Type
+from functools import cached_property
+from typing import Dict, Hashable, List, Optional, Tuple, Type, Union
 
+import numpy as np
 import pandas as pd
-from .configs import PortfolioAggregationConfig, ColumnsConfig
-from .interfaces import EScope
+from .configs import PortfolioAggregationConfig, ColumnsConfig, TemperatureScoreConfig
+from .interfaces import (
+    EScope,
+    ETimeFrames,
+    Aggregation,
+    AggregationContribution,
+    ScoreAggregation,
+    ScoreAggregationScopes,
+    ScoreAggregations,
+)
 
 
 class PortfolioAggregationMethod(Enum):
@@ -52,6 +62,540 @@ class PortfolioAggregationMethod(Enum):
         return map_value_column.get(method, column_config.MARKET_CAP)
 
 
+class ColumnarAggregation:
+    """
+    An aggregation that keeps the contributions of the companies in a data frame, instead of as a list of
+    AggregationContribution models. It can be navigated the same way as an Aggregation.
+
+    :param score: The aggregated score
+    :param proportion: The proportion of the companies in the aggregation
+    :param contributions: The contributions of the companies, sorted on their relative contribution
+    """
+
+    def __init__(self, score: float, proportion: float, contributions: pd.DataFrame):
+        self.score = score
+        self.proportion = proportion
+        self.contributions = contributions
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+    def to_model(self) -> Aggregation:
+        """
+        Convert the aggregation into an Aggregation model.
+
+        :return: The aggregation model
+        """
+        return _get_aggregation_model(
+            self.score,
+            self.proportion,
+            # Object columns, so the missing values (e.g. the company ID of the other companies) become None
+            self.contributions.astype(object)
+            .where(pd.notnull(self.contributions), None)
+            .to_dict(orient="records"),
+        )
+
+
+class ColumnarScoreAggregation:
+    """
+    A score aggregation of a single time frame and scope, that can be navigated the same way as a ScoreAggregation.
+
+    :param all: The aggregation over all companies
+    :param influence_percentage: The influence percentage of the fallback score
+    :param grouped: The aggregations per group
+    """
+
+    def __init__(
+        self,
+        all: ColumnarAggregation,
+        influence_percentage: float,
+        grouped: Dict[str, ColumnarAggregation],
+    ):
+        self.all = all
+        self.influence_percentage = influence_percentage
+        self.grouped = grouped
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+
+class ColumnarScoreAggregationScopes:
+    """
+    The score aggregations of a single time frame, that can be navigated the same way as a ScoreAggregationScopes.
+
+    :param score_aggregations: The score aggregations this time frame belongs to
+    :param time_frame: The time frame
+    """
+
+    def __init__(
+        self, score_aggregations: "ColumnarScoreAggregations", time_frame: ETimeFrames
+    ):
+        self._score_aggregations = score_aggregations
+        self._time_frame = time_frame
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+    @property
+    def S1S2(self) -> Optional[ColumnarScoreAggregation]:
+        return self._score_aggregations.get(self._time_frame, EScope.S1S2)
+
+    @property
+    def S3(self) -> Optional[ColumnarScoreAggregation]:
+        return self._score_aggregations.get(self._time_frame, EScope.S3)
+
+    @property
+    def S1S2S3(self) -> Optional[ColumnarScoreAggregation]:
+        return self._score_aggregations.get(self._time_frame, EScope.S1S2S3)
+
+
+class ColumnarScoreAggregations:
+    """
+    The score aggregations of a portfolio, with the contributions of the companies kept in a single data frame instead
+    of as AggregationContribution models. This takes a lot less memory and time to build for large portfolios. The
+    aggregations can be navigated the same way as a ScoreAggregations model (e.g. aggregations["short"]["S1S2"].all),
+    in which case the contributions are data frames. The pydantic models are only built by to_model and model_dump.
+
+    :param aggregations: The aggregations, one row per time frame, scope and group (None for the aggregation over all
+        companies), with the positions of their contributions
+    :param contributions: The contributions of the companies to the aggregations
+    :param time_frames: The time frames that were aggregated
+    :param scopes: The scopes that were aggregated
+    :param config: A class defining the constants that are used throughout this class. This parameter is only required
+                    if you'd like to overwrite a constant. This can be done by extending the PortfolioAggregationConfig
+                    class and overwriting one of the parameters.
+    """
+
+    def __init__(
+        self,
+        aggregations: pd.DataFrame,
+        contributions: pd.DataFrame,
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        config: Type[PortfolioAggregationConfig] = PortfolioAggregationConfig,
+    ):
+        self.c = config
+        self.aggregations = aggregations
+        self.contributions = contributions
+        self.time_frames = time_frames
+        self.scopes = scopes
+
+        # The position of the aggregation over all companies and of the groups of each time frame and scope
+        self._positions: Dict[Tuple[ETimeFrames, EScope], Tuple[int, List[int]]] = {}
+        for position, (time_frame, scope, group) in enumerate(
+            zip(
+                aggregations[self.c.COLS.TIME_FRAME],
+                aggregations[self.c.COLS.SCOPE],
+                aggregations[self.c.COLS.GROUP],
+            )
+        ):
+            if pd.isnull(group):
+                self._positions[(time_frame, scope)] = (position, [])
+            else:
+                self._positions[(time_frame, scope)][1].append(position)
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+    def _get_time_frame(
+        self, time_frame: ETimeFrames
+    ) -> Optional[ColumnarScoreAggregationScopes]:
+        if time_frame not in self.time_frames:
+            return None
+        return ColumnarScoreAggregationScopes(self, time_frame)
+
+    @property
+    def short(self) -> Optional[ColumnarScoreAggregationScopes]:
+        return self._get_time_frame(ETimeFrames.SHORT)
+
+    @property
+    def mid(self) -> Optional[ColumnarScoreAggregationScopes]:
+        return self._get_time_frame(ETimeFrames.MID)
+
+    @property
+    def long(self) -> Optional[ColumnarScoreAggregationScopes]:
+        return self._get_time_frame(ETimeFrames.LONG)
+
+    def _get_aggregation(self, position: int) -> ColumnarAggregation:
+        """
+        Get a single aggregation.
+
+        :param position: The position of the aggregation
+        :return: The aggregation, with a view on its contributions
+        """
+        aggregation = self.aggregations.iloc[position]
+        return ColumnarAggregation(
+            score=aggregation[self.c.COLS.SCORE],
+            proportion=aggregation[self.c.COLS.PROPORTION],
+            contributions=self.contributions.iloc[
+                aggregation[self.c.COLS.CONTRIBUTIONS_START] : aggregation[
+                    self.c.COLS.CONTRIBUTIONS_STOP
+                ]
+            ],
+        )
+
+    def get(
+        self, time_frame: ETimeFrames, scope: EScope
+    ) -> Optional[ColumnarScoreAggregation]:
+        """
+        Get the score aggregation of a time frame and scope.
+
+        :param time_frame: The time frame
+        :param scope: The scope
+        :return: The score aggregation, or None if there's no data for this time frame and scope
+        """
+        if (time_frame, scope) not in self._positions or scope not in self.scopes:
+            return None
+        position, group_positions = self._positions[(time_frame, scope)]
+        return ColumnarScoreAggregation(
+            all=self._get_aggregation(position),
+            influence_percentage=self.aggregations[
+                self.c.COLS.INFLUENCE_PERCENTAGE
+            ].iloc[position],
+            grouped={
+                self.aggregations[self.c.COLS.GROUP].iloc[
+                    group_position
+                ]: self._get_aggregation(group_position)
+                for group_position in group_positions
+            },
+        )
+
+    def to_model(self) -> ScoreAggregations:
+        """
+        Convert the score aggregations into a ScoreAggregations model.
+
+        :return: The score aggregations model
+        """
+        # Object columns, so the missing values (e.g. the company ID of the other companies) become None
+        records = (
+            self.contributions.astype(object)
+            .where(pd.notnull(self.contributions), None)
+            .to_dict(orient="records")
+        )
+        aggregations = [
+            _get_aggregation_model(
+                score,
+                proportion,
+                records[start:stop],
+            )
+            for score, proportion, start, stop in zip(
+                self.aggregations[self.c.COLS.SCORE],
+                self.aggregations[self.c.COLS.PROPORTION],
+                self.aggregations[self.c.COLS.CONTRIBUTIONS_START],
+                self.aggregations[self.c.COLS.CONTRIBUTIONS_STOP],
+            )
+        ]
+
+        score_aggregations = ScoreAggregations()
+        for time_frame in self.time_frames:
+            score_aggregation_scopes = ScoreAggregationScopes()
+            for scope in self.scopes:
+                score_aggregation = None
+                if (time_frame, scope) in self._positions:
+                    position, group_positions = self._positions[(time_frame, scope)]
+                    score_aggregation = ScoreAggregation(
+                        grouped={
+                            self.aggregations[self.c.COLS.GROUP].iloc[
+                                group_position
+                            ]: aggregations[group_position]
+                            for group_position in group_positions
+                        },
+                        all=aggregations[position],
+                        influence_percentage=self.aggregations[
+                            self.c.COLS.INFLUENCE_PERCENTAGE
+                        ].iloc[position],
+                    )
+                score_aggregation_scopes.__setattr__(scope.name, score_aggregation)
+            score_aggregations.__setattr__(time_frame.value, score_aggregation_scopes)
+        return score_aggregations
+
+    def model_dump(self, *args, **kwargs) -> dict:
+        """
+        Serialize the score aggregations the same way as ScoreAggregations.model_dump.
+
+        :return: The score aggregations as a dictionary
+        """
+        return self.to_model().model_dump(*args, **kwargs)
+
+
+def _get_aggregation_model(
+    score: float, proportion: float, contributions: List[dict]
+) -> Aggregation:
+    """
+    Build an Aggregation model.
+
+    :param score: The aggregated score
+    :param proportion: The proportion of the companies in the aggregation
+    :param contributions: The contributions of the companies, as records
+    :return: The aggregation model
+    """
+    return Aggregation(
+        score=score,
+        proportion=proportion,
+        contributions=[
+            AggregationContribution.model_validate(contribution)
+            for contribution in contributions
+        ],
+    )
+
+
+class PartialScoreAggregations:
+    """
+    The partial score aggregations of a part (a shard) of a portfolio. Instead of the weighted scores, which depend on
+    the totals over the whole portfolio, it keeps the sums of the denominators of the weights per time frame, scope,
+    group and portfolio aggregation method. With contributions, it also keeps the numerators of the weights (the
+    investment value, emissions or owned emissions) of each company, so its size grows with the shard. Without them,
+    it only keeps the sums of the numerator-weighted scores and the number of companies per time frame, scope and
+    group. Partial aggregations of different shards can be merged (in any grouping, merge is associative) and the
+    result can be finalized into the score aggregations of the whole portfolio (see
+    TemperatureScore.partial_aggregate_scores, which creates them).
+
+    :param rows: The companies of the shard, with their scores and the numerators of their weights per method, or
+        without contributions, the sums per time frame, scope and group
+    :param denominators: The sums of the denominator terms per time frame, scope and group (None for the whole time
+        frame-scope combination), per method
+    :param messages: The error message for a zero denominator, per method
+    :param time_frames: The time frames that are aggregated
+    :param scopes: The scopes that are aggregated
+    :param grouping: The columns that are grouped on
+    :param contributions: Whether the contributions of the companies are kept
+    :param config: A class defining the constants that are used throughout this class. This parameter is only required
+                    if you'd like to overwrite a constant. This can be done by extending the TemperatureScoreConfig
+                    class and overwriting one of the parameters.
+    """
+
+    def __init__(
+        self,
+        rows: pd.DataFrame,
+        denominators: Dict[
+            PortfolioAggregationMethod,
+            Dict[Tuple[ETimeFrames, EScope, Optional[str]], np.ndarray],
+        ],
+        messages: Dict[PortfolioAggregationMethod, str],
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        grouping: List[str],
+        contributions: bool = True,
+        config: Type[TemperatureScoreConfig] = TemperatureScoreConfig,
+    ):
+        self.c = config
+        self.rows = rows
+        self.denominators = denominators
+        self.messages = messages
+        self.time_frames = time_frames
+        self.scopes = scopes
+        self.grouping = grouping
+        self.contributions = contributions
+
+    @property
+    def aggregation_methods(self) -> List[PortfolioAggregationMethod]:
+        return list(self.denominators)
+
+    def get_sum_columns(self, aggregation_method: PortfolioAggregationMethod) -> List[str]:
+        """
+        Get the columns that hold the sums of the numerator-weighted temperature scores and results of a method, in the
+        partial aggregations without contributions.
+
+        :param aggregation_method: The portfolio aggregation method
+        :return: The columns of the weighted temperature scores and the weighted temperature results
+        """
+        return [
+            "{}_{}".format(aggregation_method.value, column)
+            for column in [self.c.COLS.TEMPERATURE_SCORE, self.c.TEMPERATURE_RESULTS]
+        ]
+
+    def sum_cells(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sum up the rows of each time frame, scope and group, in the partial aggregations without contributions.
+
+        :param rows: The rows with the number of companies and the sums of the weighted scores
+        :return: One row per time frame, scope and group
+        """
+        return (
+            rows.groupby(
+                [self.c.COLS.TIME_FRAME, self.c.COLS.SCOPE] + list(self.grouping),
+                dropna=False,
+                sort=False,
+            )
+            .sum()
+            .reset_index()
+        )
+
+    def merge(self, other: "PartialScoreAggregations") -> "PartialScoreAggregations":
+        """
+        Merge the partial aggregations of two shards.
+
+        :param other: The partial aggregations of the other shard
+        :return: The partial aggregations of both shards
+        """
+        if (
+            self.time_frames != other.time_frames
+            or self.scopes != other.scopes
+            or self.grouping != other.grouping
+            or self.aggregation_methods != other.aggregation_methods
+            or self.contributions != other.contributions
+        ):
+            raise ValueError(
+                "Only partial aggregations with the same time frames, scopes, grouping, aggregation methods and "
+                "contributions can be merged"
+            )
+        denominators = {}
+        for aggregation_method in self.aggregation_methods:
+            denominators[aggregation_method] = dict(
+                self.denominators[aggregation_method]
+            )
+            for key, denominator_terms in other.denominators[
+                aggregation_method
+            ].items():
+                if key in denominators[aggregation_method]:
+                    denominator_terms = (
+                        denominators[aggregation_method][key] + denominator_terms
+                    )
+                denominators[aggregation_method][key] = denominator_terms
+        rows = pd.concat([self.rows, other.rows], ignore_index=True)
+        if not self.contributions:
+            rows = self.sum_cells(rows)
+        return PartialScoreAggregations(
+            rows,
+            denominators,
+            {**self.messages, **other.messages},
+            self.time_frames,
+            self.scopes,
+            self.grouping,
+            self.contributions,
+            self.c,
+        )
+
+    def finalize(
+        self, columnar: bool = False
+    ) -> Dict[
+        PortfolioAggregationMethod, Union[ScoreAggregations, ColumnarScoreAggregations]
+    ]:
+        """
+        Finalize the partial aggregations into score aggregations.
+
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations
+        :return: The weighted temperature scores for the portfolio, per aggregation method
+        """
+        portfolio_aggregation = PortfolioAggregation(self.c)
+        groups = portfolio_aggregation._get_aggregation_groups(
+            self.rows, self.time_frames, self.scopes, self.grouping
+        )
+        score_aggregations = {}
+        for aggregation_method in self.aggregation_methods:
+            if groups is None:
+                aggregations = portfolio_aggregation._get_empty_grouped_aggregations()
+            else:
+                denominator_terms = np.array(
+                    [
+                        self.denominators[aggregation_method][key]
+                        for key in zip(groups.time_frames, groups.scopes, groups.groups)
+                    ]
+                )
+                denominators = portfolio_aggregation._sum_denominator_terms(
+                    list(denominator_terms.T)
+                )
+                if (denominators == 0).any():
+                    raise ValueError(self.messages[aggregation_method])
+                if self.contributions:
+                    aggregations = self._build_aggregations(
+                        portfolio_aggregation, groups, aggregation_method, denominators
+                    )
+                else:
+                    aggregations = self._build_summed_aggregations(
+                        portfolio_aggregation, groups, aggregation_method, denominators
+                    )
+            columnar_score_aggregations = ColumnarScoreAggregations(
+                *aggregations,
+                time_frames=self.time_frames,
+                scopes=self.scopes,
+                config=self.c,
+            )
+            score_aggregations[aggregation_method] = (
+                columnar_score_aggregations
+                if columnar
+                else columnar_score_aggregations.to_model()
+            )
+        return score_aggregations
+
+    def _build_aggregations(
+        self,
+        portfolio_aggregation: "PortfolioAggregation",
+        groups: "_AggregationGroups",
+        aggregation_method: PortfolioAggregationMethod,
+        denominators: np.ndarray,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Build the aggregations and the contributions of a method from the rows of the companies.
+
+        :param portfolio_aggregation: The portfolio aggregation to build the aggregations with
+        :param groups: The aggregations the rows are grouped into
+        :param aggregation_method: The portfolio aggregation method
+        :param denominators: The denominator of each aggregation
+        :return: The aggregations and the contributions
+        """
+        numerators = self.rows[aggregation_method.value].to_numpy(dtype=float)[
+            groups.positions
+        ]
+        weighted_scores, weighted_results = [
+            portfolio_aggregation._weigh_scores(
+                aggregation_method,
+                numerators,
+                denominators[groups.aggregation_index],
+                self.rows[column].to_numpy(dtype=float)[groups.positions],
+            )
+            for column in [self.c.COLS.TEMPERATURE_SCORE, self.c.TEMPERATURE_RESULTS]
+        ]
+        return portfolio_aggregation._build_grouped_aggregations(
+            self.rows, groups, weighted_scores, weighted_results
+        )
+
+    def _build_summed_aggregations(
+        self,
+        portfolio_aggregation: "PortfolioAggregation",
+        groups: "_AggregationGroups",
+        aggregation_method: PortfolioAggregationMethod,
+        denominators: np.ndarray,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Build the aggregations of a method from the sums per time frame, scope and group, without any contributions.
+
+        :param portfolio_aggregation: The portfolio aggregation to build the aggregations with
+        :param groups: The aggregations the sums are grouped into
+        :param aggregation_method: The portfolio aggregation method
+        :param denominators: The denominator of each aggregation
+        :return: The aggregations and the (empty) contributions
+        """
+        sizes, scores, influence_percentages = [
+            portfolio_aggregation._sum_groups(
+                self.rows[column].to_numpy(dtype=float)[groups.positions],
+                groups.starts,
+                groups.ends,
+            )
+            for column in [self.c.COLS.NUMBER_OF_COMPANIES]
+            + self.get_sum_columns(aggregation_method)
+        ]
+        total_companies = pd.Series(
+            sizes[groups.is_total], index=groups.cells[groups.is_total]
+        )
+        aggregations = pd.DataFrame(
+            {
+                self.c.COLS.TIME_FRAME: groups.time_frames,
+                self.c.COLS.SCOPE: groups.scopes,
+                self.c.COLS.GROUP: pd.Series(groups.groups, dtype=object),
+                self.c.COLS.SCORE: scores / denominators,
+                self.c.COLS.PROPORTION: sizes
+                / (total_companies.loc[groups.cells].to_numpy() / 100.0),
+                self.c.COLS.INFLUENCE_PERCENTAGE: np.where(
+                    groups.is_total, influence_percentages / denominators * 100, np.nan
+                ),
+                self.c.COLS.CONTRIBUTIONS_START: np.zeros(len(groups.starts), dtype=int),
+                self.c.COLS.CONTRIBUTIONS_STOP: np.zeros(len(groups.starts), dtype=int),
+            }
+        )
+        return aggregations, portfolio_aggregation._get_empty_grouped_aggregations()[1]
+
+
 class PortfolioAggregation(ABC):
     """
     This class is a base class that provides portfolio aggregation calculation.
@@ -107,11 +651,9 @@ class PortfolioAggregation(ABC):
             total_investment_weight = data[self.c.COLS.INVESTMENT_VALUE].sum()
             if total_investment_weight == 0:
                 raise ValueError("The portfolio weight is not allowed to be zero")
-            return data.apply(
-                lambda row: (row[self.c.COLS.INVESTMENT_VALUE] * row[input_column])
-                / total_investment_weight,
-                axis=1,
-            )
+            return (
+                data[self.c.COLS.INVESTMENT_VALUE] * data[input_column]
+            ) / total_investment_weight
 
         # Total emissions weighted temperature score (TETS)
         elif portfolio_aggregation_method == PortfolioAggregationMethod.TETS:
@@ -186,10 +728,1051 @@ class PortfolioAggregation(ABC):
             if owned_emissions == 0:
                 raise ValueError("The total owned emissions can not be zero")
             # Calculate the MOTS value per company
-            return data.apply(
-                lambda row: (row[self.c.COLS.OWNED_EMISSIONS] / owned_emissions)
-                * row[input_column],
-                axis=1,
+            return (
+                data[self.c.COLS.OWNED_EMISSIONS] / owned_emissions
+            ) * data[input_column]
+        else:
+            raise ValueError("The specified portfolio aggregation method is invalid")
+
+    @staticmethod
+    def _sum_groups(
+        values: np.ndarray, starts: np.ndarray, ends: np.ndarray
+    ) -> np.ndarray:
+        """
+        Sum the values of each group, skipping the missing values. Each group is summed on its own (rather than with a
+        grouped reduction), so the sums are exactly the same as those of the individual groups.
+
+        :param values: The values, sorted on their group
+        :param starts: The position of the first value of each group
+        :param ends: The position after the last value of each group
+        :return: The sum of each group
+        """
+        values = np.where(np.isnan(values), 0.0, values)
+        return np.array(
+            [values[start:end].sum() for start, end in zip(starts, ends)], dtype=float
+        )
+
+    def _calculate_aggregate_scores(
+        self,
+        data: pd.DataFrame,
+        input_columns: List[str],
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+        positions: np.ndarray,
+        groups: np.ndarray,
+    ) -> List[np.ndarray]:
+        """
+        Aggregate the scores in a number of columns for many groups at once. This gives the same results as calling
+        _calculate_aggregate_score on every group separately (and raises the same error for the first group that can't be
+        aggregated), but calculates the weights of all groups column-wise.
+
+        :param data: The data to run the calculations on
+        :param input_columns: The input columns (containing the scores)
+        :param portfolio_aggregation_method: The method to use
+        :param positions: The row positions of the members of each group, a row can be a member of multiple groups
+        :param groups: The group of each position, the positions should be sorted on their group
+        :return: The aggregate score of each position, per input column
+        """
+        return self._calculate_aggregate_scores_per_method(
+            data, input_columns, [portfolio_aggregation_method], positions, groups
+        )[0]
+
+    def _calculate_aggregate_scores_per_method(
+        self,
+        data: pd.DataFrame,
+        input_columns: List[str],
+        portfolio_aggregation_methods: List[PortfolioAggregationMethod],
+        positions: np.ndarray,
+        groups: np.ndarray,
+    ) -> List[List[np.ndarray]]:
+        """
+        Aggregate the scores in a number of columns for many groups at once, with a number of portfolio aggregation
+        methods. The columns, scope masks, missing value checks and emissions are only read or calculated once and
+        shared between the methods. If a method can't aggregate one of the groups, its error is raised (for the first
+        such method).
+
+        :param data: The data to run the calculations on
+        :param input_columns: The input columns (containing the scores)
+        :param portfolio_aggregation_methods: The methods to use
+        :param positions: The row positions of the members of each group, a row can be a member of multiple groups
+        :param groups: The group of each position, the positions should be sorted on their group
+        :return: The aggregate score of each position per input column, per method
+        """
+        inputs = _AggregationInputs(data, positions, groups, self.c)
+        return [
+            self._calculate_method_aggregate_scores(
+                inputs, input_columns, portfolio_aggregation_method
+            )
+            for portfolio_aggregation_method in portfolio_aggregation_methods
+        ]
+
+    def _calculate_method_aggregate_scores(
+        self,
+        inputs: "_AggregationInputs",
+        input_columns: List[str],
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+    ) -> List[np.ndarray]:
+        """
+        Aggregate the scores in a number of columns for many groups at once, with a single portfolio aggregation method.
+
+        :param inputs: The (shared) columns of the groups
+        :param input_columns: The input columns (containing the scores)
+        :param portfolio_aggregation_method: The method to use
+        :return: The aggregate score of each position, per input column
+        """
+        if len(inputs.positions) == 0:
+            return [np.empty(0) for _ in input_columns]
+
+        numerators, denominator_terms, checks, message = self._get_method_weights(
+            inputs, portfolio_aggregation_method
+        )
+        denominators = self._sum_denominator_terms(denominator_terms)
+        checks.append((denominators == 0, None, message))
+        self._raise_first_failing_group(inputs, checks)
+        return [
+            self._weigh_scores(
+                portfolio_aggregation_method,
+                numerators,
+                denominators[inputs.group_index],
+                inputs.get_column(input_column),
+            )
+            for input_column in input_columns
+        ]
+
+    def _get_method_weights(
+        self,
+        inputs: "_AggregationInputs",
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+    ) -> Tuple[
+        np.ndarray,
+        List[np.ndarray],
+        List[Tuple[np.ndarray, Optional[str], Optional[str]]],
+        str,
+    ]:
+        """
+        Get the parts of the weights of a portfolio aggregation method. The weight of a company is its numerator (the
+        investment value, emissions or owned emissions) divided by the sum of the denominator terms of its group.
+
+        :param inputs: The (shared) columns of the groups
+        :param portfolio_aggregation_method: The method to use
+        :return: The numerator of each position, the denominator terms of each group, the checks that the groups need
+            to pass before they can be aggregated (in the order in which _calculate_aggregate_score does them, as
+            (failing groups, column to check, error message) tuples) and the error message for a zero denominator
+        """
+        checks: List[Tuple[np.ndarray, Optional[str], Optional[str]]] = []
+
+        def check_column(column: str, used: bool = True):
+            checks.append((inputs.is_missing(column) & used, column, None))
+
+        if portfolio_aggregation_method == PortfolioAggregationMethod.WATS:
+            investment_values = inputs.get_column(self.c.COLS.INVESTMENT_VALUE)
+            return (
+                investment_values,
+                [inputs.sum_groups(investment_values)],
+                checks,
+                "The portfolio weight is not allowed to be zero",
+            )
+
+        # Total emissions weighted temperature score (TETS)
+        elif portfolio_aggregation_method == PortfolioAggregationMethod.TETS:
+            check_column(self.c.COLS.GHG_SCOPE3, inputs.uses_S3)
+            check_column(self.c.COLS.GHG_SCOPE12, inputs.uses_S1S2)
+            # Calculate the total emissions of all companies
+            return (
+                inputs.emissions,
+                [
+                    inputs.sum_groups(inputs.emissions_S1S2),
+                    inputs.sum_groups(inputs.emissions_S3),
+                ],
+                checks,
+                "The total emissions should be higher than zero",
+            )
+
+        elif PortfolioAggregationMethod.is_emissions_based(
+            portfolio_aggregation_method
+        ):
+            # These four methods only differ in the way the company is valued.
+            value_column = PortfolioAggregationMethod.get_value_column(
+                portfolio_aggregation_method, self.c.COLS
+            )
+            if portfolio_aggregation_method == PortfolioAggregationMethod.ECOTS:
+                check_column(self.c.COLS.COMPANY_ENTERPRISE_VALUE)
+                check_column(self.c.COLS.CASH_EQUIVALENTS)
+                values = inputs.get_column(
+                    self.c.COLS.COMPANY_ENTERPRISE_VALUE
+                ) + inputs.get_column(self.c.COLS.CASH_EQUIVALENTS)
+                values_missing = inputs.any_in_group(np.isnan(values))
+            else:
+                values = inputs.get_column(value_column)
+                values_missing = inputs.is_missing(value_column)
+
+            # Calculate the total owned emissions of all companies
+            check_column(self.c.COLS.INVESTMENT_VALUE)
+            checks.append((values_missing, value_column, None))
+            check_column(self.c.COLS.GHG_SCOPE12, inputs.uses_S1S2)
+            check_column(self.c.COLS.GHG_SCOPE3, inputs.uses_S3)
+            checks.append(
+                (
+                    inputs.any_in_group(values == 0),
+                    None,
+                    "To calculate the aggregation, the {} column may not be zero".format(
+                        value_column
+                    ),
+                )
+            )
+            owned_emissions = (
+                inputs.get_column(self.c.COLS.INVESTMENT_VALUE) / values
+            ) * inputs.emissions
+            return (
+                owned_emissions,
+                [inputs.sum_groups(owned_emissions)],
+                checks,
+                "The total owned emissions can not be zero",
             )
         else:
             raise ValueError("The specified portfolio aggregation method is invalid")
+
+    @staticmethod
+    def _sum_denominator_terms(denominator_terms: List[np.ndarray]) -> np.ndarray:
+        """
+        Add up the denominator terms of a portfolio aggregation method.
+
+        :param denominator_terms: The denominator terms of each group
+        :return: The denominator of each group
+        """
+        denominators = denominator_terms[0]
+        for denominator_term in denominator_terms[1:]:
+            denominators = denominators + denominator_term
+        return denominators
+
+    @staticmethod
+    def _weigh_scores(
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+        numerators: np.ndarray,
+        denominators: np.ndarray,
+        values: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Weigh the scores of the companies, with the same order of operations as _calculate_aggregate_score.
+
+        :param portfolio_aggregation_method: The method to use
+        :param numerators: The numerator of the weight of each company
+        :param denominators: The denominator of the weight of each company
+        :param values: The scores
+        :return: The weighted scores
+        """
+        if portfolio_aggregation_method == PortfolioAggregationMethod.WATS:
+            return (numerators * values) / denominators
+        elif portfolio_aggregation_method == PortfolioAggregationMethod.TETS:
+            return numerators / denominators * values
+        return (numerators / denominators) * values
+
+    def _get_aggregation_groups(
+        self,
+        data: pd.DataFrame,
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        grouping: List[str],
+        portfolios: Optional[np.ndarray] = None,
+    ) -> Optional["_AggregationGroups"]:
+        """
+        Group the rows of the data into aggregations: one per time frame-scope combination and one per group within
+        them. The aggregations are sorted in the order in which TemperatureScore.aggregate_scores processes them (time
+        frame, scope, the whole combination and then the groups, sorted like groupby does) and the rows within each
+        aggregation keep their order in the data.
+
+        :param data: The data to group
+        :param time_frames: The time frames to aggregate
+        :param scopes: The scopes to aggregate
+        :param grouping: The columns to group on within each time frame-scope combination
+        :param portfolios: The portfolio of each row, as an integer code, to aggregate a number of portfolios at once.
+            The aggregations are then sorted on their portfolio first.
+        :return: The aggregations, or None if there are no rows for any of the time frames and scopes
+        """
+        time_frame_codes = np.full(len(data), -1)
+        for i, time_frame in enumerate(time_frames):
+            time_frame_codes[(data[self.c.COLS.TIME_FRAME] == time_frame).to_numpy()] = i
+        scope_codes = np.full(len(data), -1)
+        for i, scope in enumerate(scopes):
+            scope_codes[(data[self.c.COLS.SCOPE] == scope).to_numpy()] = i
+        rows = np.flatnonzero((time_frame_codes >= 0) & (scope_codes >= 0))
+        if len(rows) == 0:
+            return None
+        cells = time_frame_codes[rows] * len(scopes) + scope_codes[rows]
+        if portfolios is not None:
+            cells = cells + portfolios[rows] * (len(time_frames) * len(scopes))
+
+        (
+            positions,
+            aggregation_index,
+            starts,
+            aggregation_cells,
+            groups,
+        ) = self._group_cells(data, rows, cells, grouping)
+        return _AggregationGroups(
+            positions=positions,
+            aggregation_index=aggregation_index,
+            starts=starts,
+            time_frames=[
+                time_frames[cell // len(scopes) % len(time_frames)]
+                for cell in aggregation_cells
+            ],
+            scopes=[scopes[cell % len(scopes)] for cell in aggregation_cells],
+            groups=groups,
+            cells=aggregation_cells,
+            portfolios=aggregation_cells // (len(time_frames) * len(scopes)),
+        )
+
+    def _group_cells(
+        self,
+        data: pd.DataFrame,
+        rows: np.ndarray,
+        cells: np.ndarray,
+        grouping: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        Group rows of the data into aggregations: one per cell (e.g. a time frame-scope combination) and one per group
+        within each cell. The aggregations are sorted on their cell, with the aggregation over the whole cell first and
+        then the groups, sorted like groupby does. The rows within each aggregation keep their order in the data.
+
+        :param data: The data to group
+        :param rows: The positions of the rows to group
+        :param cells: The cell of each of the rows
+        :param grouping: The columns to group on within each cell
+        :return: The row positions of the members of each aggregation (sorted on their aggregation), the aggregation of
+            each position, the position of the first member of each aggregation, the cell of each aggregation and the
+            group of each aggregation (None for the aggregation over the whole cell)
+        """
+        # The rows of the aggregations over the whole cells (subgroup -1)
+        order = np.argsort(cells, kind="stable")
+        positions = [rows[order]]
+        position_cells = [cells[order]]
+        subgroups = [np.full(len(rows), -1)]
+        group_names = []
+        if len(grouping) > 0:
+            # The rows of the aggregations per group, sorted on their group like groupby does
+            group_data = data.iloc[rows][grouping].fillna("unknown")
+            grouped = group_data.groupby(
+                [pd.Series(cells, index=group_data.index)]
+                + [group_data[column] for column in grouping]
+            )
+            group_codes = grouped.ngroup().to_numpy()
+            group_names = [
+                "-".join([str(group_name) for group_name in keys[1:]])
+                for keys in grouped.size().index
+            ]
+            order = np.argsort(group_codes, kind="stable")
+            positions.append(rows[order])
+            position_cells.append(cells[order])
+            subgroups.append(group_codes[order])
+        positions = np.concatenate(positions)
+        position_cells = np.concatenate(position_cells)
+        subgroups = np.concatenate(subgroups)
+
+        # Sort the positions on their aggregation
+        order = np.lexsort((subgroups, position_cells))
+        positions, position_cells, subgroups = (
+            positions[order],
+            position_cells[order],
+            subgroups[order],
+        )
+        is_start = np.r_[
+            True,
+            (position_cells[1:] != position_cells[:-1])
+            | (subgroups[1:] != subgroups[:-1]),
+        ]
+        starts = np.flatnonzero(is_start)
+        aggregation_cells = position_cells[starts]
+        aggregation_subgroups = subgroups[starts]
+        return (
+            positions,
+            np.cumsum(is_start) - 1,
+            starts,
+            aggregation_cells,
+            [
+                None if subgroup == -1 else group_names[subgroup]
+                for subgroup in aggregation_subgroups
+            ],
+        )
+
+    def _get_empty_grouped_aggregations(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Get the aggregations and contributions of a data set without any rows to aggregate.
+
+        :return: The (empty) aggregations and contributions
+        """
+        return (
+            pd.DataFrame(
+                columns=[
+                    self.c.COLS.TIME_FRAME,
+                    self.c.COLS.SCOPE,
+                    self.c.COLS.GROUP,
+                    self.c.COLS.SCORE,
+                    self.c.COLS.PROPORTION,
+                    self.c.COLS.INFLUENCE_PERCENTAGE,
+                    self.c.COLS.CONTRIBUTIONS_START,
+                    self.c.COLS.CONTRIBUTIONS_STOP,
+                ]
+            ),
+            pd.DataFrame(
+                columns=[
+                    self.c.COLS.COMPANY_NAME,
+                    self.c.COLS.COMPANY_ID,
+                    self.c.COLS.TEMPERATURE_SCORE,
+                    self.c.COLS.CONTRIBUTION_RELATIVE,
+                    self.c.COLS.CONTRIBUTION,
+                ]
+            ),
+        )
+
+    def _build_grouped_aggregations(
+        self,
+        data: pd.DataFrame,
+        groups: "_AggregationGroups",
+        weighted_scores: np.ndarray,
+        weighted_results: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+        top_contributors: Optional[int] = None,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Build the aggregations and the contributions from the weighted scores of the aggregations.
+
+        :param data: The data that was aggregated
+        :param groups: The aggregations the data was grouped into
+        :param weighted_scores: The weighted temperature score of each position
+        :param weighted_results: The weighted temperature results of each position
+        :param weights: The weight of each position, only required if the contributions are limited to the top
+            contributors
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them). The
+            other companies of an aggregation are summed up into a single contribution, which comes last.
+        :return: The aggregations (one row per time frame, scope and group, where the group is None for the aggregation
+            over the whole time frame-scope combination) and the contributions of the companies to them. The
+            contributions of an aggregation are in the rows between its contributions start and stop position, sorted
+            on their relative contribution.
+        """
+        scores = self._sum_groups(weighted_scores, groups.starts, groups.ends)
+        contributions_relative = weighted_scores / (
+            np.repeat(scores, groups.sizes) / 100
+        )
+
+        if top_contributors is None:
+            # Sort the contributions of each aggregation on their relative contribution, the missing ones last
+            order = np.lexsort(
+                (
+                    -contributions_relative,
+                    np.isnan(contributions_relative),
+                    groups.aggregation_index,
+                )
+            )
+            starts, stops = groups.starts, groups.ends
+        else:
+            (
+                order,
+                starts,
+                stops,
+                other_scores,
+                other_relative,
+                other_contributions,
+            ) = self._get_top_contributions(
+                groups,
+                weighted_scores,
+                contributions_relative,
+                weights,
+                top_contributors,
+            )
+
+        contribution_positions = groups.positions[order]
+        contributions = pd.DataFrame(
+            {
+                self.c.COLS.COMPANY_NAME: data[self.c.COLS.COMPANY_NAME]
+                .iloc[contribution_positions]
+                .to_numpy(),
+                self.c.COLS.COMPANY_ID: data[self.c.COLS.COMPANY_ID]
+                .iloc[contribution_positions]
+                .to_numpy(),
+                self.c.COLS.TEMPERATURE_SCORE: data[self.c.COLS.TEMPERATURE_SCORE]
+                .iloc[contribution_positions]
+                .to_numpy(),
+                self.c.COLS.CONTRIBUTION_RELATIVE: contributions_relative[order],
+                self.c.COLS.CONTRIBUTION: weighted_scores[order],
+            }
+        )
+        if top_contributors is not None:
+            # The rows of the other companies are filled in after gathering the rows of the top contributors
+            is_other = order < 0
+            for column, values in [
+                (self.c.COLS.COMPANY_NAME, self.c.OTHER_CONTRIBUTIONS),
+                (self.c.COLS.COMPANY_ID, None),
+                (self.c.COLS.TEMPERATURE_SCORE, other_scores),
+                (self.c.COLS.CONTRIBUTION_RELATIVE, other_relative),
+                (self.c.COLS.CONTRIBUTION, other_contributions),
+            ]:
+                contributions.loc[is_other, column] = values
+
+        influence_percentages = (
+            self._sum_groups(weighted_results, groups.starts, groups.ends) * 100
+        )
+        aggregations = pd.DataFrame(
+            {
+                self.c.COLS.TIME_FRAME: groups.time_frames,
+                self.c.COLS.SCOPE: groups.scopes,
+                self.c.COLS.GROUP: pd.Series(groups.groups, dtype=object),
+                self.c.COLS.SCORE: scores,
+                self.c.COLS.PROPORTION: groups.proportions,
+                self.c.COLS.INFLUENCE_PERCENTAGE: np.where(
+                    groups.is_total, influence_percentages, np.nan
+                ),
+                self.c.COLS.CONTRIBUTIONS_START: starts,
+                self.c.COLS.CONTRIBUTIONS_STOP: stops,
+            }
+        )
+        return aggregations, contributions
+
+    @staticmethod
+    def _get_top_contributions(
+        groups: "_AggregationGroups",
+        weighted_scores: np.ndarray,
+        contributions_relative: np.ndarray,
+        weights: np.ndarray,
+        top_contributors: int,
+    ) -> Tuple[
+        np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray
+    ]:
+        """
+        Select the top contributors of each aggregation. The top contributors are selected with a partition instead of a
+        full sort, only the selected contributions are sorted. Companies with equal contributions are selected in the
+        order of the data, so the top contributors are exactly the first ones of the fully sorted contributions. The
+        other companies of each aggregation are summed up into a single contribution, whose temperature score is the
+        weighted average score of those companies. This contribution is left out if the other companies have neither
+        weight nor contribution.
+
+        :param groups: The aggregations the data was grouped into
+        :param weighted_scores: The weighted temperature score of each position
+        :param contributions_relative: The relative contribution of each position
+        :param weights: The weight of each position
+        :param top_contributors: The number of contributions to keep per aggregation
+        :return: The position of each contribution (-1 for the contributions of the other companies), the contributions
+            start and stop position of each aggregation and the temperature score, the relative contribution and the
+            contribution of the other companies of each aggregation that has them
+        """
+        if top_contributors < 0:
+            raise ValueError("The number of top contributors can not be negative")
+        # Rank on descending contribution, with the missing contributions last
+        ranks = np.where(
+            np.isnan(contributions_relative), np.inf, -contributions_relative
+        )
+        orders = []
+        sizes = groups.sizes.copy()
+        other_scores = []
+        other_relative = []
+        other_contributions = []
+        for i, (start, end) in enumerate(zip(groups.starts, groups.ends)):
+            group_ranks = ranks[start:end]
+            if end - start <= top_contributors:
+                orders.append(start + np.argsort(group_ranks, kind="stable"))
+                continue
+
+            selected = np.zeros(end - start, dtype=bool)
+            if top_contributors > 0:
+                kth_rank = np.partition(group_ranks, top_contributors - 1)[
+                    top_contributors - 1
+                ]
+                selected = group_ranks < kth_rank
+                ties = np.flatnonzero(group_ranks == kth_rank)
+                selected[ties[: top_contributors - selected.sum()]] = True
+            top = np.flatnonzero(selected)
+            orders.append(start + top[np.argsort(group_ranks[top], kind="stable")])
+            sizes[i] = len(top)
+
+            other = start + np.flatnonzero(~selected)
+            other_weight = np.nansum(weights[other])
+            other_contribution = np.nansum(weighted_scores[other])
+            if other_weight == 0 and other_contribution == 0:
+                # The other companies don't weigh in, so there's nothing to sum up
+                continue
+            orders.append(np.array([-1]))
+            sizes[i] += 1
+            other_scores.append(
+                other_contribution / other_weight if other_weight != 0 else np.nan
+            )
+            other_relative.append(np.nansum(contributions_relative[other]))
+            other_contributions.append(other_contribution)
+
+        stops = np.cumsum(sizes)
+        return (
+            np.concatenate(orders),
+            stops - sizes,
+            stops,
+            np.array(other_scores, dtype=float),
+            np.array(other_relative, dtype=float),
+            np.array(other_contributions, dtype=float),
+        )
+
+    def _split_grouped_aggregations(
+        self,
+        aggregations: pd.DataFrame,
+        contributions: pd.DataFrame,
+        groups: "_AggregationGroups",
+        number_of_portfolios: int,
+    ) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Split the aggregations of a number of portfolios, that were grouped at once, into the aggregations of each
+        portfolio.
+
+        :param aggregations: The aggregations of all portfolios
+        :param contributions: The contributions of all portfolios
+        :param groups: The aggregations the data was grouped into
+        :param number_of_portfolios: The number of portfolios
+        :return: The aggregations and the contributions, per portfolio
+        """
+        bounds = np.searchsorted(groups.portfolios, np.arange(number_of_portfolios + 1))
+        portfolio_aggregations = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            if start == stop:
+                portfolio_aggregations.append(self._get_empty_grouped_aggregations())
+                continue
+            aggregations_portfolio = aggregations.iloc[start:stop].reset_index(
+                drop=True
+            )
+            first_contribution = aggregations[self.c.COLS.CONTRIBUTIONS_START].iloc[
+                start
+            ]
+            for column in [
+                self.c.COLS.CONTRIBUTIONS_START,
+                self.c.COLS.CONTRIBUTIONS_STOP,
+            ]:
+                aggregations_portfolio[column] -= first_contribution
+            portfolio_aggregations.append(
+                (
+                    aggregations_portfolio,
+                    contributions.iloc[
+                        first_contribution : aggregations[
+                            self.c.COLS.CONTRIBUTIONS_STOP
+                        ].iloc[stop - 1]
+                    ].reset_index(drop=True),
+                )
+            )
+        return portfolio_aggregations
+
+    def _get_look_through_holdings(
+        self, holdings: pd.DataFrame, hierarchy: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Resolve the effective holdings of every fund in a fund hierarchy (e.g. a fund-of-funds). The holdings of a fund
+        are its own holdings, plus the holdings of each of its sub-funds multiplied by the weight of the sub-fund in the
+        fund. This is the sparse matrix product of the paths through the hierarchy with the holdings, where the paths
+        are expanded one level at a time.
+
+        :param holdings: The direct holdings of the funds, with the portfolio_id, the company_id, the investment_value
+            and any grouping columns
+        :param hierarchy: The fund hierarchy, one row per parent_portfolio_id and child_portfolio_id, with the weight of
+            the child in the parent: the fraction of the child's holdings that the parent holds through it
+        :return: The effective holdings of all funds in the holdings and the hierarchy, with the company_id, the
+            investment_value and the grouping columns of the direct holdings
+        """
+        parents = hierarchy[self.c.COLS.PARENT_PORTFOLIO_ID]
+        children = hierarchy[self.c.COLS.CHILD_PORTFOLIO_ID]
+        funds = pd.Index(
+            pd.unique(
+                pd.concat(
+                    [holdings[self.c.COLS.PORTFOLIO_ID], parents, children],
+                    ignore_index=True,
+                )
+            )
+        )
+
+        # The edges of the hierarchy, sorted on their parent (like a CSR matrix)
+        parent_codes = funds.get_indexer(parents)
+        order = np.argsort(parent_codes, kind="stable")
+        edge_children = funds.get_indexer(children)[order]
+        edge_weights = hierarchy[self.c.COLS.HIERARCHY_WEIGHT].to_numpy(dtype=float)[
+            order
+        ]
+        edge_starts = np.searchsorted(parent_codes[order], np.arange(len(funds)))
+        edge_counts = np.diff(np.r_[edge_starts, len(order)])
+
+        # All paths through the hierarchy (starting with the paths from each fund to itself), with the product of the
+        # weights along the path. A path can't be longer than the number of funds, unless there's a cycle.
+        ancestors = np.arange(len(funds))
+        descendants = np.arange(len(funds))
+        weights = np.ones(len(funds))
+        paths = [(ancestors, descendants, weights)]
+        for _ in range(len(funds)):
+            counts = edge_counts[descendants]
+            paths_before = np.repeat(np.arange(len(descendants)), counts)
+            edges = edge_starts[descendants][paths_before] + (
+                np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            )
+            ancestors = ancestors[paths_before]
+            descendants = edge_children[edges]
+            weights = weights[paths_before] * edge_weights[edges]
+            if len(descendants) == 0:
+                break
+            paths.append((ancestors, descendants, weights))
+        else:
+            raise ValueError("The fund hierarchy contains a cycle")
+        ancestors, descendants, weights = [np.concatenate(path) for path in zip(*paths)]
+        order = np.argsort(ancestors, kind="stable")
+
+        grouping = [
+            column
+            for column in holdings.columns
+            if column
+            not in [
+                self.c.COLS.PORTFOLIO_ID,
+                self.c.COLS.COMPANY_ID,
+                self.c.COLS.INVESTMENT_VALUE,
+            ]
+        ]
+        look_through_holdings = pd.merge(
+            left=pd.DataFrame(
+                {
+                    self.c.COLS.PORTFOLIO_ID: funds[ancestors[order]],
+                    self.c.COLS.CHILD_PORTFOLIO_ID: funds[descendants[order]],
+                    self.c.COLS.HIERARCHY_WEIGHT: weights[order],
+                }
+            ),
+            right=holdings.rename(
+                columns={self.c.COLS.PORTFOLIO_ID: self.c.COLS.CHILD_PORTFOLIO_ID}
+            ),
+            how="inner",
+            on=self.c.COLS.CHILD_PORTFOLIO_ID,
+        )
+        look_through_holdings[self.c.COLS.INVESTMENT_VALUE] = (
+            look_through_holdings[self.c.COLS.HIERARCHY_WEIGHT]
+            * look_through_holdings[self.c.COLS.INVESTMENT_VALUE]
+        )
+        return (
+            look_through_holdings.groupby(
+                [self.c.COLS.PORTFOLIO_ID, self.c.COLS.COMPANY_ID] + grouping,
+                dropna=False,
+                sort=False,
+            )[self.c.COLS.INVESTMENT_VALUE]
+            .sum()
+            .reset_index()
+        )
+
+    def _get_panel_data(
+        self, data: Dict[Hashable, pd.DataFrame], holdings: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Join a panel of holdings onto data that's only available per reporting date, e.g. the company scores, which only
+        have to be calculated once per reporting date instead of once per holdings date. Every holdings date uses the
+        data of the latest reporting date on or before it.
+
+        :param data: The data per reporting date
+        :param holdings: The holdings panel: the investment value of each company (the index) at each holdings date (the
+            columns). Companies that aren't held at a certain date have a missing or zero investment value.
+        :return: The data of the companies that are held, one row per holdings date and row in the data of its
+            reporting date, with the holdings date and the investment value of the holding
+        """
+        reporting_dates = pd.Index(sorted(data))
+        reporting_positions = reporting_dates.get_indexer(
+            holdings.columns, method="pad"
+        )
+        if (reporting_positions == -1).any():
+            raise ValueError(
+                "There is no data on or before the holdings date {}".format(
+                    holdings.columns[reporting_positions == -1][0]
+                )
+            )
+
+        investment_values = holdings.fillna(0).to_numpy(dtype=float)
+        company_positions, date_positions = np.nonzero(investment_values != 0)
+        held = pd.DataFrame(
+            {
+                self.c.COLS.COMPANY_ID: holdings.index[company_positions],
+                self.c.COLS.REPORTING_DATE: reporting_dates[
+                    reporting_positions[date_positions]
+                ],
+                self.c.COLS.HOLDINGS_DATE: holdings.columns[date_positions],
+                self.c.COLS.INVESTMENT_VALUE: investment_values[
+                    company_positions, date_positions
+                ],
+            }
+        )
+        reporting_data = pd.concat(
+            [
+                data[reporting_date]
+                .drop(columns=[self.c.COLS.INVESTMENT_VALUE], errors="ignore")
+                .assign(**{self.c.COLS.REPORTING_DATE: reporting_date})
+                for reporting_date in reporting_dates
+            ],
+            ignore_index=True,
+        )
+        return pd.merge(
+            left=reporting_data,
+            right=held,
+            how="inner",
+            on=[self.c.COLS.REPORTING_DATE, self.c.COLS.COMPANY_ID],
+        )
+
+    def _partially_aggregate_scores(
+        self,
+        data: pd.DataFrame,
+        aggregation_methods: List[PortfolioAggregationMethod],
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        grouping: List[str],
+        contributions: bool = True,
+    ) -> PartialScoreAggregations:
+        """
+        Partially aggregate the scores of a shard of a portfolio. The checks that only depend on the companies in the
+        shard are done here, the check for a zero denominator is done when the partial aggregations are finalized.
+
+        :param data: The results of the calculate method, for the companies in the shard
+        :param aggregation_methods: The portfolio aggregation methods to use
+        :param time_frames: The time frames to aggregate
+        :param scopes: The scopes to aggregate
+        :param grouping: The columns to group on within each time frame-scope combination
+        :param contributions: Whether to keep the companies for the contributions, or only the sums per time frame,
+            scope and group
+        :return: The partial aggregations of the shard
+        """
+        columns = (
+            [self.c.COLS.TIME_FRAME, self.c.COLS.SCOPE]
+            + list(grouping)
+            + [
+                self.c.COLS.COMPANY_NAME,
+                self.c.COLS.COMPANY_ID,
+                self.c.COLS.TEMPERATURE_SCORE,
+                self.c.TEMPERATURE_RESULTS,
+            ]
+        )
+        groups = self._get_aggregation_groups(data, time_frames, scopes, grouping)
+        row_positions = (
+            np.empty(0, dtype=int) if groups is None else np.unique(groups.positions)
+        )
+        rows = data.iloc[row_positions][columns].reset_index(drop=True)
+
+        denominators = {}
+        messages = {}
+        inputs = _AggregationInputs(
+            data,
+            np.empty(0, dtype=int) if groups is None else groups.positions,
+            np.empty(0, dtype=int) if groups is None else groups.aggregation_index,
+            self.c,
+        )
+        for aggregation_method in aggregation_methods:
+            if groups is None:
+                rows[aggregation_method.value] = np.empty(0)
+                denominators[aggregation_method] = {}
+                continue
+            (
+                numerators,
+                denominator_terms,
+                checks,
+                messages[aggregation_method],
+            ) = self._get_method_weights(inputs, aggregation_method)
+            self._raise_first_failing_group(inputs, checks)
+
+            row_numerators = np.full(len(data), np.nan)
+            row_numerators[groups.positions] = numerators
+            rows[aggregation_method.value] = row_numerators[row_positions]
+            denominators[aggregation_method] = dict(
+                zip(
+                    zip(groups.time_frames, groups.scopes, groups.groups),
+                    np.column_stack(denominator_terms),
+                )
+            )
+        partial_aggregations = PartialScoreAggregations(
+            rows, denominators, messages, time_frames, scopes, grouping, contributions, self.c
+        )
+        if not contributions:
+            summed_rows = rows[
+                [self.c.COLS.TIME_FRAME, self.c.COLS.SCOPE] + list(grouping)
+            ].assign(**{self.c.COLS.NUMBER_OF_COMPANIES: 1})
+            for aggregation_method in aggregation_methods:
+                for column, sum_column in zip(
+                    [self.c.COLS.TEMPERATURE_SCORE, self.c.TEMPERATURE_RESULTS],
+                    partial_aggregations.get_sum_columns(aggregation_method),
+                ):
+                    summed_rows[sum_column] = (
+                        rows[aggregation_method.value].to_numpy(dtype=float)
+                        * rows[column].to_numpy(dtype=float)
+                    )
+            partial_aggregations.rows = partial_aggregations.sum_cells(summed_rows)
+        return partial_aggregations
+
+    def _raise_first_failing_group(
+        self,
+        inputs: "_AggregationInputs",
+        checks: List[Tuple[np.ndarray, Optional[str], Optional[str]]],
+    ):
+        """
+        Raise the error of the first group that fails one of the checks, if there's any.
+
+        :param inputs: The columns of the groups the checks were done on
+        :param checks: The checks, as (failing groups, column to check, error message) tuples
+        """
+        failing = np.logical_or.reduce([failing for failing, _, _ in checks])
+        if not failing.any():
+            return
+        group = np.flatnonzero(failing)[0]
+        for failing, column, message in checks:
+            if failing[group]:
+                if column is not None:
+                    self._check_column(inputs.get_group_data(group), column)
+                else:
+                    raise ValueError(message)
+
+
+class _AggregationGroups:
+    """
+    The aggregations (time frame-scope combinations and the groups within them) that the rows of a data set are grouped
+    into.
+
+    :param positions: The row positions of the members of each aggregation, sorted on their aggregation
+    :param aggregation_index: The aggregation of each position
+    :param starts: The position of the first member of each aggregation
+    :param time_frames: The time frame of each aggregation
+    :param scopes: The scope of each aggregation
+    :param groups: The group of each aggregation (None for the aggregation over the whole time frame-scope combination)
+    :param cells: The time frame-scope combination of each aggregation
+    :param portfolios: The portfolio of each aggregation (all zero when a single portfolio is aggregated)
+    """
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        aggregation_index: np.ndarray,
+        starts: np.ndarray,
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        groups: List[Optional[str]],
+        cells: np.ndarray,
+        portfolios: np.ndarray,
+    ):
+        self.positions = positions
+        self.aggregation_index = aggregation_index
+        self.starts = starts
+        self.ends = np.r_[starts[1:], len(positions)]
+        self.sizes = self.ends - starts
+        self.time_frames = time_frames
+        self.scopes = scopes
+        self.groups = groups
+        self.cells = cells
+        self.portfolios = portfolios
+        self.is_total = np.array([group is None for group in groups], dtype=bool)
+
+        # The proportion of the companies of the time frame-scope combination that's in each aggregation
+        total_companies = pd.Series(self.sizes[self.is_total], index=cells[self.is_total])
+        self.proportions = self.sizes / (
+            total_companies.loc[cells].to_numpy() / 100.0
+        )
+
+
+class _AggregationInputs:
+    """
+    The columns that are needed to aggregate the scores of a number of groups at once. Each column (and each column that
+    is derived from them, like the scope masks and the emissions) is only read or calculated once, so it can be shared
+    between the portfolio aggregation methods.
+
+    :param data: The data to run the calculations on
+    :param positions: The row positions of the members of each group, a row can be a member of multiple groups
+    :param groups: The group of each position, the positions should be sorted on their group
+    :param config: The config that defines the column names
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        positions: np.ndarray,
+        groups: np.ndarray,
+        config: Type[PortfolioAggregationConfig],
+    ):
+        self.c = config
+        self.data = data
+        self.positions = positions
+        if len(positions) > 0:
+            self.starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        else:
+            self.starts = np.empty(0, dtype=int)
+        self.ends = np.r_[self.starts[1:], len(positions)].astype(int)
+        self.group_index = np.repeat(np.arange(len(self.starts)), self.ends - self.starts)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._missing: Dict[str, np.ndarray] = {}
+
+    def get_column(self, column: str) -> np.ndarray:
+        """
+        Get the values of a column, for each position.
+
+        :param column: The column
+        :return: The values of the column as floats
+        """
+        if column not in self._columns:
+            self._columns[column] = self.data[column].to_numpy(dtype=float)[
+                self.positions
+            ]
+        return self._columns[column]
+
+    def is_missing(self, column: str) -> np.ndarray:
+        """
+        Check which groups miss a value in a column for one of their members.
+
+        :param column: The column
+        :return: Whether each group misses a value
+        """
+        if column not in self._missing:
+            self._missing[column] = self.any_in_group(np.isnan(self.get_column(column)))
+        return self._missing[column]
+
+    def any_in_group(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Check which groups have a member for which the mask is set.
+
+        :param mask: The mask, for each position
+        :return: Whether the mask is set for any member of each group
+        """
+        return np.bincount(self.group_index[mask], minlength=len(self.starts)) > 0
+
+    def sum_groups(self, values: np.ndarray) -> np.ndarray:
+        """
+        Sum the values of each group, skipping the missing values.
+
+        :param values: The values, for each position
+        :return: The sum of each group
+        """
+        return PortfolioAggregation._sum_groups(values, self.starts, self.ends)
+
+    def get_group_data(self, group: int) -> pd.DataFrame:
+        """
+        Get the rows of the members of a group.
+
+        :param group: The group
+        :return: The rows of the group
+        """
+        return self.data.iloc[self.positions[self.starts[group] : self.ends[group]]]
+
+    @cached_property
+    def use_S1S2(self) -> np.ndarray:
+        scopes = self.data[self.c.COLS.SCOPE]
+        return ((scopes == EScope.S1S2) | (scopes == EScope.S1S2S3)).to_numpy()[
+            self.positions
+        ]
+
+    @cached_property
+    def use_S3(self) -> np.ndarray:
+        scopes = self.data[self.c.COLS.SCOPE]
+        return ((scopes == EScope.S3) | (scopes == EScope.S1S2S3)).to_numpy()[
+            self.positions
+        ]
+
+    @cached_property
+    def uses_S1S2(self) -> np.ndarray:
+        return self.any_in_group(self.use_S1S2)
+
+    @cached_property
+    def uses_S3(self) -> np.ndarray:
+        return self.any_in_group(self.use_S3)
+
+    @cached_property
+    def emissions_S1S2(self) -> np.ndarray:
+        return self.use_S1S2 * self.get_column(self.c.COLS.GHG_SCOPE12)
+
+    @cached_property
+    def emissions_S3(self) -> np.ndarray:
+        return self.use_S3 * self.get_column(self.c.COLS.GHG_SCOPE3)
+
+    @cached_property
+    def emissions(self) -> np.ndarray:
+        return self.emissions_S1S2 + self.emissions_S3
@@ -1,4 +1,5 @@
-from typing import Type, Optional
+from typing import Dict, Hashable, List, Type, Optional
+import numpy as np
 import pandas as pd
 from SBTi.configs import PortfolioCoverageTVPConfig
 from SBTi.portfolio_aggregation import PortfolioAggregation, PortfolioAggregationMethod
@@ -19,6 +20,15 @@ class PortfolioCoverageTVP(PortfolioAggregation):
         super().__init__(config)
         self.c: Type[PortfolioCoverageTVPConfig] = config
 
+    def _get_target_status(self, company_data: pd.DataFrame) -> np.ndarray:
+        """
+        Get the target status of the companies: 100 if they have a SBTi validated target and 0 otherwise.
+
+        :param company_data: The company data
+        :return: The target status of each company
+        """
+        return np.where(company_data[self.c.COLS.SBTI_VALIDATED].astype(bool), 100, 0)
+
     def get_portfolio_coverage(
         self,
         company_data: pd.DataFrame,
@@ -31,10 +41,171 @@ class PortfolioCoverageTVP(PortfolioAggregation):
         :param portfolio_aggregation_method: PortfolioAggregationMethod: The aggregation method to use
         :return: The aggregated score
         """
-        company_data[self.c.OUTPUT_TARGET_STATUS] = company_data.apply(
-            lambda row: 100 if row[self.c.COLS.SBTI_VALIDATED] else 0, axis=1
+        company_data[self.c.OUTPUT_TARGET_STATUS] = self._get_target_status(
+            company_data
         )
 
         return self._calculate_aggregate_score(
             company_data, self.c.OUTPUT_TARGET_STATUS, portfolio_aggregation_method
         ).sum()
+
+    def get_portfolio_coverage_history(
+        self,
+        company_data: pd.DataFrame,
+        sbti_validity: pd.DataFrame,
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+    ) -> pd.Series:
+        """
+        Get the TVP portfolio coverage of a portfolio at a number of cutoff dates at once, from the SBTi validity of its
+        companies at each date (see SBTi.get_sbti_validity). The weights of the companies are calculated once and
+        applied to the target status at all dates.
+
+        :param company_data: The company data of the portfolio
+        :param sbti_validity: A company x date matrix of the SBTi validity, one row per company id and one column per
+            cutoff date. Companies that aren't in the matrix don't have a SBTi validated target.
+        :param portfolio_aggregation_method: PortfolioAggregationMethod: The aggregation method to use
+        :return: The time series of the portfolio coverage, one value per cutoff date
+        """
+        validity = (
+            sbti_validity[~sbti_validity.index.duplicated()]
+            .reindex(company_data[self.c.COLS.COMPANY_ID], fill_value=False)
+            .to_numpy(dtype=bool)
+        )
+        status_columns = [
+            "{}_{}".format(self.c.OUTPUT_TARGET_STATUS, i)
+            for i in range(len(sbti_validity.columns))
+        ]
+        data = pd.concat(
+            [
+                company_data.reset_index(drop=True),
+                pd.DataFrame(np.where(validity, 100, 0), columns=status_columns),
+            ],
+            axis=1,
+        )
+
+        coverage = np.full(len(sbti_validity.columns), np.nan)
+        if len(data) > 0:
+            weighted_statuses = self._calculate_aggregate_scores(
+                data,
+                status_columns,
+                portfolio_aggregation_method,
+                np.arange(len(data)),
+                np.zeros(len(data), dtype=int),
+            )
+            coverage = np.array(
+                [
+                    self._sum_groups(weighted_status, [0], [len(data)])[0]
+                    for weighted_status in weighted_statuses
+                ]
+            )
+        return pd.Series(coverage, index=sbti_validity.columns)
+
+    def get_portfolio_coverage_panel(
+        self,
+        company_data: Dict[Hashable, pd.DataFrame],
+        holdings: pd.DataFrame,
+        portfolio_aggregation_method: PortfolioAggregationMethod,
+    ) -> pd.Series:
+        """
+        Get the TVP portfolio coverage of a fund at a number of holdings dates at once. Each holdings date uses the
+        company data of the latest reporting date on or before it.
+
+        :param company_data: The company data per reporting date
+        :param holdings: The holdings panel: the investment value of each company (the index) at each holdings date (the
+            columns). Companies that aren't held at a certain date have a missing or zero investment value.
+        :param portfolio_aggregation_method: PortfolioAggregationMethod: The aggregation method to use
+        :return: The time series of the portfolio coverage (missing for the holdings dates without any holdings)
+        """
+        data = self._get_panel_data(company_data, holdings)
+        data[self.c.OUTPUT_TARGET_STATUS] = self._get_target_status(data)
+
+        holdings_dates = holdings.columns.get_indexer(data[self.c.COLS.HOLDINGS_DATE])
+        positions = np.argsort(holdings_dates, kind="stable")
+        held_dates, starts = np.unique(holdings_dates[positions], return_index=True)
+        ends = np.r_[starts[1:], len(positions)]
+        (weighted_status,) = self._calculate_aggregate_scores(
+            data,
+            [self.c.OUTPUT_TARGET_STATUS],
+            portfolio_aggregation_method,
+            positions,
+            np.repeat(np.arange(len(starts)), ends - starts),
+        )
+
+        coverage = np.full(len(holdings.columns), np.nan)
+        coverage[held_dates] = self._sum_groups(weighted_status, starts, ends)
+        return pd.Series(
+            coverage, index=holdings.columns.rename(self.c.COLS.HOLDINGS_DATE)
+        )
+
+    def get_portfolio_coverages(
+        self,
+        company_data: pd.DataFrame,
+        holdings: pd.DataFrame,
+        portfolio_aggregation_methods: List[PortfolioAggregationMethod],
+        grouping: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Get the TVP portfolio coverage of a number of portfolios, for a number of aggregation methods at once. The
+        company data (and so the SBTi matching) is shared between the portfolios and all portfolios, groups and
+        methods are aggregated in one pass, which gives the same coverages as get_portfolio_coverage.
+
+        :param company_data: The company data of all companies held by any of the portfolios, one row per company
+        :param holdings: The holdings of all portfolios, with the portfolio_id, the company_id and the investment_value.
+            If the holdings contain the grouping columns they're used instead of the ones in the company data.
+        :param portfolio_aggregation_methods: The aggregation methods to use
+        :param grouping: The columns to group on within each portfolio
+        :return: The coverages, one row per portfolio and group (where the group is None for the whole portfolio), with
+            one column per aggregation method
+        """
+        if grouping is None:
+            grouping = []
+        holdings_columns = [
+            self.c.COLS.PORTFOLIO_ID,
+            self.c.COLS.COMPANY_ID,
+            self.c.COLS.INVESTMENT_VALUE,
+        ] + [column for column in grouping if column in holdings.columns]
+        data = pd.merge(
+            left=company_data.drop(
+                columns=[
+                    column
+                    for column in holdings_columns[2:]
+                    if column in company_data.columns
+                ]
+            ),
+            right=holdings[holdings_columns],
+            how="inner",
+            on=self.c.COLS.COMPANY_ID,
+        )
+        columns = [self.c.COLS.PORTFOLIO_ID, self.c.COLS.GROUP] + [
+            method.value for method in portfolio_aggregation_methods
+        ]
+        if len(data) == 0:
+            return pd.DataFrame(columns=columns)
+        data[self.c.OUTPUT_TARGET_STATUS] = self._get_target_status(data)
+
+        portfolio_ids = pd.Index(holdings[self.c.COLS.PORTFOLIO_ID].unique())
+        positions, aggregation_index, starts, portfolios, groups = self._group_cells(
+            data,
+            np.arange(len(data)),
+            portfolio_ids.get_indexer(data[self.c.COLS.PORTFOLIO_ID]),
+            grouping,
+        )
+        ends = np.r_[starts[1:], len(positions)]
+        coverages = {
+            self.c.COLS.PORTFOLIO_ID: portfolio_ids[portfolios],
+            self.c.COLS.GROUP: pd.Series(groups, dtype=object),
+        }
+        weighted_statuses = self._calculate_aggregate_scores_per_method(
+            data,
+            [self.c.OUTPUT_TARGET_STATUS],
+            portfolio_aggregation_methods,
+            positions,
+            aggregation_index,
+        )
+        for portfolio_aggregation_method, (weighted_status,) in zip(
+            portfolio_aggregation_methods, weighted_statuses
+        ):
+            coverages[portfolio_aggregation_method.value] = self._sum_groups(
+                weighted_status, starts, ends
+            )
+        return pd.DataFrame(coverages, columns=columns)
@@ -1,8 +1,9 @@
 import datetime
 import itertools
 
+import numpy as np
 import pandas as pd
-from typing import Type, List, Tuple, Optional
+from typing import Type, List, Tuple, Optional, Dict
 from SBTi.configs import PortfolioAggregationConfig
 import logging
 
@@ -24,17 +25,36 @@ class TargetProtocol:
         relative to the reporting year. When provided, targets are validated against this date
         (e.g. a target's end year must be >= reporting_date's year) and time-frame buckets
         (short/mid/long) are calculated relative to it. When None, defaults to datetime.now().
+    :param vectorized: Whether to select the targets of the 9-box grid with a single sort over all targets (default) or
+        cell by cell. The cell by cell selection is kept as a reference implementation and gives the same results.
+    :param sparse: Whether to create a sparse 9-box grid, which only contains the cells that have a target, plus a
+        marker row per company (without a time frame and scope) that holds the company data. The marker rows are
+        flagged in the grid marker column. The TemperatureScore class fills out the cells without a target from the
+        marker rows, which gives the same scores as the full grid.
+    :param scopes: The scopes to create the grid for (None for all of them). The S1+S2+S3 scope needs the S1+S2 and S3
+        cells, so these are added if it's requested. The targets of other scopes are dropped before they're grouped.
+    :param time_frames: The time frames to create the grid for (None for all of them). The targets of other time
+        frames are dropped before they're grouped.
     """
 
     def __init__(
         self,
         config: Type[PortfolioAggregationConfig] = PortfolioAggregationConfig,
         reporting_date: Optional[datetime.datetime] = None,
+        vectorized: bool = True,
+        sparse: bool = False,
+        scopes: Optional[List[EScope]] = None,
+        time_frames: Optional[List[ETimeFrames]] = None,
     ):
         self.c = config
+        self.vectorized = vectorized
+        self.sparse = sparse
+        self.scopes = scopes
+        self.time_frames = time_frames
         self.logger = logging.getLogger(__name__)
         self.reference_date = reporting_date if reporting_date is not None else datetime.datetime.now()
         self.s2_targets: List[IDataProviderTarget] = []
+        self.s2_index: Dict[Tuple, IDataProviderTarget] = {}
         self.target_data: pd.DataFrame = pd.DataFrame()
         self.company_data: pd.DataFrame = pd.DataFrame()
         self.data: pd.DataFrame = pd.DataFrame()
@@ -49,10 +69,68 @@ class TargetProtocol:
         :param companies: A list of companies
         :return: A data frame that combines the processed data
         """
+        if self.vectorized:
+            return self.process_data(
+                pd.DataFrame.from_records([t.model_dump() for t in targets]),
+                pd.DataFrame.from_records([c.model_dump() for c in companies]),
+            )
+
         # Create multiindex on company, timeframe and scope for performance later on
         targets = self.prepare_targets(targets)
         self.target_data = pd.DataFrame.from_records([c.model_dump() for c in targets])
+        self.company_data = pd.DataFrame.from_records([c.model_dump() for c in companies])
+        return self._combine_target_data()
+
+    def process_data(
+        self, target_data: pd.DataFrame, company_data: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Process the targets and companies in data frames, one row per target or company with the fields of
+        IDataProviderTarget or IDataProviderCompany as columns. The targets are validated and prepared column-wise (see
+        prepare_target_data), which gives the same 9-box grid as the process method without creating a model for each
+        target.
+
+        :param target_data: The targets
+        :param company_data: The companies
+        :return: A data frame that combines the processed data
+        """
+        self.target_data = self.prepare_target_data(target_data)
+        self.company_data = company_data
+        return self._combine_target_data()
+
+    def get_grid_cells(self) -> Tuple[List[ETimeFrames], List[EScope]]:
+        """
+        Get the time frames and scopes of the grid, in the order of the grid. If S1+S2+S3 is requested, the S1+S2 and
+        S3 scopes are included as well, as the S1+S2+S3 score is calculated from them.
+
+        :return: The time frames and the scopes of the grid
+        """
+        time_frames = list(ETimeFrames)
+        if self.time_frames is not None:
+            time_frames = [
+                time_frame for time_frame in time_frames if time_frame in self.time_frames
+            ]
+        scopes = [EScope.S1S2, EScope.S3, EScope.S1S2S3]
+        if self.scopes is not None:
+            requested_scopes = set(self.scopes)
+            if EScope.S1S2S3 in requested_scopes:
+                requested_scopes.update([EScope.S1S2, EScope.S3])
+            scopes = [scope for scope in scopes if scope in requested_scopes]
+        return time_frames, scopes
+
+    def _combine_target_data(self) -> pd.DataFrame:
+        """
+        Create the 9-box grid from the prepared targets and combine it with the company data.
 
+        :return: A data frame that combines the processed data
+        """
+        if self.scopes is not None or self.time_frames is not None:
+            # Drop the targets that don't end up in the grid before they're grouped
+            time_frames, scopes = self.get_grid_cells()
+            self.target_data = self.target_data[
+                self.target_data[self.c.COLS.TIME_FRAME].isin(time_frames)
+                & self.target_data[self.c.COLS.SCOPE].isin(scopes)
+            ]
         # Create an indexed DF for performance purposes
         self.target_data.index = (
             self.target_data.reset_index()
@@ -63,7 +141,6 @@ class TargetProtocol:
         )
         self.target_data = self.target_data.sort_index()
 
-        self.company_data = pd.DataFrame.from_records([c.model_dump() for c in companies])
         self.group_targets()
         return pd.merge(
             left=self.data, right=self.company_data, how="outer", on=["company_id"]
@@ -152,6 +229,39 @@ class TargetProtocol:
         else:
             return target, None
 
+    @staticmethod
+    def _get_s2_key(target: IDataProviderTarget) -> Tuple:
+        """
+        Get the key on which an S1 target is matched with the S2 targets.
+
+        :param target: The target
+        :return: The company, base year, start year, end year, target type and intensity metric of the target
+        """
+        return (
+            target.company_id,
+            target.base_year,
+            target.start_year,
+            target.end_year,
+            target.target_type,
+            target.intensity_metric,
+        )
+
+    def _index_s2_targets(self):
+        """
+        Index the S2 targets on the key on which they're matched with the S1 targets, keeping only the best match per
+        key: the one with the highest coverage and base year. If there are multiple best matches, the first one is
+        kept.
+        """
+        self.s2_index = {}
+        for s2 in self.s2_targets:
+            key = self._get_s2_key(s2)
+            best = self.s2_index.get(key)
+            if best is None or (s2.coverage_s2, s2.base_year) > (
+                best.coverage_s2,
+                best.base_year,
+            ):
+                self.s2_index[key] = s2
+
     def _combine_s1_s2(self, target: IDataProviderTarget):
         """
         Check if there is an S2 target that matches this target exactly (if this is a S1 target) and combine them into one target.
@@ -160,22 +270,8 @@ class TargetProtocol:
         :return: The combined target (or the original if no combining was required)
         """
         if target.scope == EScope.S1 and not pd.isnull(target.base_year_ghg_s1):
-            matches = [
-                t
-                for t in self.s2_targets
-                if t.company_id == target.company_id
-                and t.base_year == target.base_year
-                and t.start_year == target.start_year
-                and t.end_year == target.end_year
-                and t.target_type == target.target_type
-                and t.intensity_metric == target.intensity_metric
-            ]
-            if len(matches) > 0:
-                matches.sort(
-                    key=lambda t: (t.coverage_s2, t.base_year),
-                    reverse=True,
-                )
-                s2 = matches[0]
+            s2 = self.s2_index.get(self._get_s2_key(target))
+            if s2 is not None:
                 ghg_sum = target.base_year_ghg_s1 + s2.base_year_ghg_s2
                 if ghg_sum == 0:
                     # Can't combine targets if total base year GHG is zero
@@ -306,6 +402,7 @@ class TargetProtocol:
                 targets,
             )
         )
+        self._index_s2_targets()
 
         targets = list(
             filter(
@@ -324,6 +421,269 @@ class TargetProtocol:
 
         return targets
 
+    def prepare_target_data(self, target_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Validate and prepare the targets in a data frame. This runs the same steps as prepare_targets (validate,
+        _split_s1s2s3, _combine_s1_s2, _convert_s1_s2, _boundary_coverage and _time_frame) as column operations on all
+        targets at once and gives the same targets, in the same order.
+
+        :param target_data: The targets, one row per target with the fields of IDataProviderTarget as columns
+        :return: The prepared targets
+        """
+        missing_columns = [
+            column
+            for column in [
+                self.c.COLS.COMPANY_ID,
+                self.c.COLS.TARGET_REFERENCE_NUMBER,
+                self.c.COLS.SCOPE,
+                self.c.COLS.COVERAGE_S1,
+                self.c.COLS.COVERAGE_S2,
+                self.c.COLS.COVERAGE_S3,
+                self.c.COLS.REDUCTION_AMBITION,
+                self.c.COLS.BASE_YEAR,
+                self.c.COLS.BASEYEAR_GHG_S1,
+                self.c.COLS.BASEYEAR_GHG_S2,
+                self.c.COLS.BASEYEAR_GHG_S3,
+                self.c.COLS.END_YEAR,
+            ]
+            if column not in target_data.columns
+        ]
+        if len(missing_columns) > 0:
+            raise ValueError(
+                "The targets are missing the following columns: {}".format(
+                    ", ".join(missing_columns)
+                )
+            )
+        data = target_data.copy()
+        for column, default in [
+            (self.c.COLS.INTENSITY_METRIC, None),
+            (self.c.COLS.START_YEAR, None),
+            (self.c.COLS.TIME_FRAME, None),
+            (self.c.COLS.ACHIEVED_EMISSIONS, 0),
+        ]:
+            if column not in data.columns:
+                data[column] = default
+        data[self.c.COLS.SCOPE] = data[self.c.COLS.SCOPE].map(
+            lambda scope: scope if isinstance(scope, EScope) else EScope(scope)
+        )
+
+        data = data[self.validate_target_data(data)].reset_index(drop=True)
+        data = self._split_s1s2s3_data(data)
+        data = self._combine_s1_s2_data(data)
+        data = self._convert_s1_s2_data(data)
+        data = self._boundary_coverage_data(data)
+        return self._time_frame_data(data)
+
+    def validate_target_data(self, data: pd.DataFrame) -> pd.Series:
+        """
+        Validate the targets in a data frame, like validate does for a single target. The start year of the targets
+        without one is set to their base year.
+
+        :param data: The targets
+        :return: Whether each target is valid
+        """
+        target_type = data[self.c.COLS.TARGET_REFERENCE_NUMBER].str.lower()
+        intensity_metric = data[self.c.COLS.INTENSITY_METRIC]
+        # Only absolute targets or intensity targets with a valid intensity metric are allowed.
+        valid_type = target_type.str.contains("abs", regex=False) | (
+            target_type.str.contains("int", regex=False)
+            & intensity_metric.notnull()
+            & (intensity_metric.fillna("").astype(str).str.lower() != "other")
+        )
+        # The target should not have achieved it's reduction yet.
+        achieved_reduction = data[self.c.COLS.ACHIEVED_EMISSIONS].astype(float)
+        in_process = achieved_reduction.isnull() | (achieved_reduction < 1)
+
+        # The end year should be greater than the start year.
+        base_year = data[self.c.COLS.BASE_YEAR]
+        data[self.c.COLS.START_YEAR] = (
+            data[self.c.COLS.START_YEAR].fillna(base_year).astype(base_year.dtype)
+        )
+        end_year = data[self.c.COLS.END_YEAR]
+        valid_end_year = end_year > data[self.c.COLS.START_YEAR]
+
+        # The end year should be greater than or equal to the current year
+        current = end_year >= self.reference_date.year
+
+        # Delete all S1 or S2 targets we can't combine
+        scope = data[self.c.COLS.SCOPE]
+        has_base_year_ghg = (
+            data[self.c.COLS.BASEYEAR_GHG_S1].notnull()
+            & data[self.c.COLS.BASEYEAR_GHG_S2].notnull()
+        )
+        s1 = (scope != EScope.S1) | (
+            data[self.c.COLS.COVERAGE_S1].notnull() & has_base_year_ghg
+        )
+        s2 = (scope != EScope.S2) | (
+            data[self.c.COLS.COVERAGE_S2].notnull() & has_base_year_ghg
+        )
+        return valid_type & in_process & valid_end_year & current & s1 & s2
+
+    def _split_s1s2s3_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Split the S1+S2+S3 targets in a data frame into an S1+S2 and an S3 target, like _split_s1s2s3. The S3 target
+        directly follows the S1+S2 target it was split from.
+
+        :param data: The validated targets
+        :return: The split targets
+        """
+        is_s1s2s3 = data[self.c.COLS.SCOPE] == EScope.S1S2S3
+        coverage_s1 = data[self.c.COLS.COVERAGE_S1]
+        coverage_s2 = data[self.c.COLS.COVERAGE_S2]
+        ghg_s1 = data[self.c.COLS.BASEYEAR_GHG_S1]
+        ghg_s2 = data[self.c.COLS.BASEYEAR_GHG_S2]
+        has_ghg = ghg_s1.notnull() & ghg_s2.notnull()
+
+        s3 = data[is_s1s2s3 & data[self.c.COLS.COVERAGE_S3].notnull()].copy()
+        s3[self.c.COLS.SCOPE] = EScope.S3
+
+        s1s2 = data.copy()
+        to_s1s2 = is_s1s2s3 & (has_ghg | (coverage_s1 == coverage_s2))
+        s1s2.loc[to_s1s2, self.c.COLS.SCOPE] = EScope.S1S2
+        reweigh = to_s1s2 & has_ghg & (ghg_s1 + ghg_s2 != 0)
+        coverage = (coverage_s1 * ghg_s1 + coverage_s2 * ghg_s2) / (ghg_s1 + ghg_s2)
+        s1s2.loc[reweigh, self.c.COLS.COVERAGE_S1] = coverage[reweigh]
+        s1s2.loc[reweigh, self.c.COLS.COVERAGE_S2] = coverage[reweigh]
+
+        return (
+            pd.concat([s1s2, s3])
+            .sort_index(kind="stable")
+            .reset_index(drop=True)
+        )
+
+    def _combine_s1_s2_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Combine the S1 targets in a data frame with the S2 target that matches them, like _combine_s1_s2. The S2
+        targets are matched on the same key and the best match of each key is picked the same way.
+
+        :param data: The split targets
+        :return: The combined targets
+        """
+        keys = [
+            self.c.COLS.COMPANY_ID,
+            self.c.COLS.BASE_YEAR,
+            self.c.COLS.START_YEAR,
+            self.c.COLS.END_YEAR,
+            self.c.COLS.TARGET_REFERENCE_NUMBER,
+            self.c.COLS.INTENSITY_METRIC,
+        ]
+        scope = data[self.c.COLS.SCOPE]
+        s2_targets = data[
+            (scope == EScope.S2)
+            & data[self.c.COLS.BASEYEAR_GHG_S2].notnull()
+            & data[self.c.COLS.COVERAGE_S2].notnull()
+        ]
+        # The best match of each key is the first S2 target with the highest coverage
+        s2_targets = s2_targets.loc[
+            s2_targets.groupby(keys, dropna=False, sort=False)[
+                self.c.COLS.COVERAGE_S2
+            ].idxmax()
+        ]
+        s1_targets = data[
+            (scope == EScope.S1) & data[self.c.COLS.BASEYEAR_GHG_S1].notnull()
+        ]
+        matches = pd.merge(
+            left=s1_targets[keys].reset_index(),
+            right=s2_targets[
+                keys
+                + [
+                    self.c.COLS.COVERAGE_S2,
+                    self.c.COLS.BASEYEAR_GHG_S2,
+                    self.c.COLS.REDUCTION_AMBITION,
+                ]
+            ],
+            how="inner",
+            on=keys,
+        ).set_index("index")
+        if matches.empty:
+            return data
+
+        s1 = data.loc[matches.index]
+        coverage_s1 = s1[self.c.COLS.COVERAGE_S1]
+        ghg_s1 = s1[self.c.COLS.BASEYEAR_GHG_S1]
+        coverage_s2 = matches[self.c.COLS.COVERAGE_S2]
+        ghg_s2 = matches[self.c.COLS.BASEYEAR_GHG_S2]
+        ghg_sum = ghg_s1 + ghg_s2
+        weighted_coverage = coverage_s1 * ghg_s1 + coverage_s2 * ghg_s2
+        # Can't combine targets if total base year GHG or the weighted coverage is zero
+        combine = (ghg_sum != 0) & (weighted_coverage != 0)
+        combined = matches.index[combine]
+        reduction_ambition = (
+            s1[self.c.COLS.REDUCTION_AMBITION] * coverage_s1 * ghg_s1
+            + matches[self.c.COLS.REDUCTION_AMBITION] * coverage_s2 * ghg_s2
+        ) / weighted_coverage
+        combined_coverage = weighted_coverage / ghg_sum
+
+        data = data.copy()
+        data.loc[combined, self.c.COLS.REDUCTION_AMBITION] = reduction_ambition[combine]
+        data.loc[combined, self.c.COLS.COVERAGE_S1] = combined_coverage[combine]
+        data.loc[combined, self.c.COLS.COVERAGE_S2] = combined_coverage[combine]
+        data.loc[combined, self.c.COLS.SCOPE] = EScope.S1S2
+        return data
+
+    def _convert_s1_s2_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert the S1 and S2 targets in a data frame into S1+S2 targets, like _convert_s1_s2.
+
+        :param data: The combined targets
+        :return: The converted targets
+        """
+        ghg_s1 = data[self.c.COLS.BASEYEAR_GHG_S1]
+        ghg_s2 = data[self.c.COLS.BASEYEAR_GHG_S2]
+        # In both cases the base_year_ghg s1 + s2 should not be zero
+        convertible = ghg_s1 + ghg_s2 != 0
+        scope = data[self.c.COLS.SCOPE]
+        data = data.copy()
+        for converted_scope, coverage_column, ghg in [
+            (EScope.S1, self.c.COLS.COVERAGE_S1, ghg_s1),
+            (EScope.S2, self.c.COLS.COVERAGE_S2, ghg_s2),
+        ]:
+            convert = convertible & (scope == converted_scope)
+            coverage = data[coverage_column] * ghg / (ghg_s1 + ghg_s2)
+            data.loc[convert, self.c.COLS.COVERAGE_S1] = coverage[convert]
+            data.loc[convert, self.c.COLS.COVERAGE_S2] = coverage[convert]
+            data.loc[convert, self.c.COLS.SCOPE] = EScope.S1S2
+        return data
+
+    def _boundary_coverage_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Scale the reduction ambition of the targets in a data frame with their boundary coverage, like
+        _boundary_coverage.
+
+        :param data: The converted targets
+        :return: The targets with a weighted reduction ambition, if so required
+        """
+        scope = data[self.c.COLS.SCOPE]
+        data = data.copy()
+        for covered_scope, coverage_column, threshold in [
+            (EScope.S1S2, self.c.COLS.COVERAGE_S1, 0.95),
+            (EScope.S3, self.c.COLS.COVERAGE_S3, 0.67),
+        ]:
+            coverage = data[coverage_column]
+            scale = (scope == covered_scope) & (coverage < threshold)
+            data.loc[scale, self.c.COLS.REDUCTION_AMBITION] = (
+                data[self.c.COLS.REDUCTION_AMBITION] * coverage
+            )[scale]
+        return data
+
+    def _time_frame_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fill out the time frame of the targets in a data frame, like _time_frame.
+
+        :param data: The targets
+        :return: The targets with the time_frame column filled out (if so required)
+        """
+        time_frame = data[self.c.COLS.END_YEAR] - self.reference_date.year
+        data = data.copy()
+        data[self.c.COLS.TIME_FRAME] = data[self.c.COLS.TIME_FRAME].astype(object)
+        for time_frame_bucket, conditions in [
+            (ETimeFrames.LONG, (time_frame > 15) & (time_frame <= 30)),
+            (ETimeFrames.MID, (time_frame > 4) & (time_frame <= 15)),
+            (ETimeFrames.SHORT, time_frame <= 4),
+        ]:
+            data.loc[conditions, self.c.COLS.TIME_FRAME] = time_frame_bucket
+        return data
+
     def _find_target(self, row: pd.Series, target_columns: List[str]) -> pd.Series:
         """
         Find the target that corresponds to a given row. If there are multiple targets available, filter them.
@@ -399,14 +759,19 @@ class TargetProtocol:
             self.c.COLS.SCOPE,
         ]
         companies = self.company_data[self.c.COLS.COMPANY_ID].unique()
-        scopes = [EScope.S1S2, EScope.S3, EScope.S1S2S3]
+        time_frames, scopes = self.get_grid_cells()
+        if self.vectorized or self.sparse:
+            self.data = self._select_targets(
+                companies, time_frames, scopes, grid_columns
+            )
+            return
         empty_columns = [
             column for column in self.target_data.columns if column not in grid_columns
         ]
         extended_data = pd.DataFrame(
             list(
                 itertools.product(
-                    *[companies, ETimeFrames, scopes] + [[None]] * len(empty_columns)
+                    *[companies, time_frames, scopes] + [[None]] * len(empty_columns)
                 )
             ),
             columns=grid_columns + empty_columns,
@@ -415,3 +780,116 @@ class TargetProtocol:
         self.data = extended_data.apply(
             lambda row: self._find_target(row, target_columns), axis=1
         )
+
+    def _select_targets(
+        self,
+        companies: np.ndarray,
+        time_frames: List[ETimeFrames],
+        scopes: List[EScope],
+        grid_columns: List[str],
+    ) -> pd.DataFrame:
+        """
+        Create the 9-box grid by selecting the targets of all cells at once. All targets are sorted on the selection
+        criteria of _find_target in one (stable) sort, after which the first target of each company, time frame and
+        scope is the selected one. The selected targets are then reindexed onto the grid, the cells without a target
+        only contain the company, time frame and scope.
+
+        :param companies: The companies of the grid
+        :param time_frames: The time frames of the grid
+        :param scopes: The scopes of the grid
+        :param grid_columns: The columns that identify a cell of the grid
+        :return: The 9-box grid, with the columns of the target data
+        """
+        target_data = self.target_data.reset_index(drop=True)
+        coverage = target_data[self.c.COLS.COVERAGE_S1].where(
+            target_data[self.c.COLS.SCOPE] != EScope.S3,
+            target_data[self.c.COLS.COVERAGE_S3],
+        )
+        has_complete_data = (
+            target_data[self.c.COLS.REDUCTION_AMBITION].notna()
+            & target_data[self.c.COLS.BASE_YEAR].notna()
+            & target_data[self.c.COLS.END_YEAR].notna()
+            & (target_data[self.c.COLS.END_YEAR] > target_data[self.c.COLS.BASE_YEAR])
+        ).astype(int)
+        order = pd.DataFrame(
+            {
+                "coverage": coverage,
+                self.c.COLS.END_YEAR: target_data[self.c.COLS.END_YEAR],
+                self.c.COLS.BASE_YEAR: target_data[self.c.COLS.BASE_YEAR],
+                self.c.COLS.TARGET_REFERENCE_NUMBER: target_data[
+                    self.c.COLS.TARGET_REFERENCE_NUMBER
+                ],
+                "has_complete_data": has_complete_data,
+            }
+        ).sort_values(
+            by=[
+                "coverage",
+                self.c.COLS.END_YEAR,
+                self.c.COLS.BASE_YEAR,
+                self.c.COLS.TARGET_REFERENCE_NUMBER,
+                "has_complete_data",
+            ],
+            ascending=[False, False, False, True, False],
+            kind="stable",
+        ).index
+        selected_targets = (
+            target_data.loc[order]
+            .drop_duplicates(subset=grid_columns, keep="first")
+            .set_index(grid_columns)
+        )
+
+        grid = pd.MultiIndex.from_product(
+            [companies, time_frames, scopes], names=grid_columns
+        )
+        target_columns = grid_columns + [
+            column for column in target_data.columns if column not in grid_columns
+        ]
+        if self.sparse:
+            return self._get_sparse_grid(
+                selected_targets, grid, companies, target_columns
+            )
+        data = selected_targets.reindex(grid)
+        # Like in the cell by cell selection, the cells without a target are empty (None) in the object columns
+        object_columns = data.columns[data.dtypes == object]
+        data.loc[~grid.isin(selected_targets.index), object_columns] = None
+        return data.reset_index()[target_columns]
+
+    def _get_sparse_grid(
+        self,
+        selected_targets: pd.DataFrame,
+        grid: pd.MultiIndex,
+        companies: np.ndarray,
+        target_columns: List[str],
+    ) -> pd.DataFrame:
+        """
+        Create a sparse 9-box grid: the cells that have a target, in the order of the full grid, and a marker row for
+        each company that comes before the cells of the company. The marker rows have no time frame and scope and are
+        empty in the target columns, like the cells without a target in the full grid. The grid marker column is True
+        for the marker rows and False for the cells.
+
+        :param selected_targets: The selected target of each cell that has one, indexed on the cell
+        :param grid: The cells of the full grid
+        :param companies: The companies of the grid
+        :param target_columns: The columns of the grid
+        :return: The sparse 9-box grid
+        """
+        positions = grid.get_indexer(selected_targets.index)
+        order = np.argsort(positions, kind="stable")
+        cells = selected_targets.iloc[order[positions[order] >= 0]].reset_index()[
+            target_columns
+        ]
+
+        markers = cells.iloc[:0].reindex(range(len(companies)))
+        object_columns = markers.columns[markers.dtypes == object]
+        markers[object_columns] = None
+        markers[self.c.COLS.COMPANY_ID] = companies
+        markers[self.c.COLS.GRID_MARKER] = True
+        cells[self.c.COLS.GRID_MARKER] = False
+
+        data = pd.concat([markers, cells], ignore_index=True)
+        company_positions = pd.Index(companies).get_indexer(
+            data[self.c.COLS.COMPANY_ID]
+        )
+        return data.iloc[np.argsort(company_positions, kind="stable")].reset_index(
+            drop=True
+        )
@@ -1,5 +1,6 @@
+import copy
 from enum import Enum
-from typing import Optional, Tuple, Type, List
+from typing import Dict, Hashable, Iterable, Optional, Tuple, Type, List, Union
 
 import pandas as pd
 import numpy as np
@@ -16,8 +17,14 @@ from .interfaces import (
     ScoreAggregations,
     PortfolioCompany,
 )
-from .portfolio_aggregation import PortfolioAggregation, PortfolioAggregationMethod
+from .portfolio_aggregation import (
+    PortfolioAggregation,
+    PortfolioAggregationMethod,
+    ColumnarScoreAggregations,
+    PartialScoreAggregations,
+)
 from .configs import TemperatureScoreConfig
+from .input_tables import INPUT_TABLES
 from . import data, utils
 
 
@@ -165,6 +172,8 @@ class TemperatureScore(PortfolioAggregation):
     :param config: A class defining the constants that are used throughout this class. This parameter is only required
                     if you'd like to overwrite a constant. This can be done by extending the TemperatureScoreConfig
                     class and overwriting one of the parameters.
+    :param vectorized: Whether to score the targets column-wise over the whole data frame (default) or row by row.
+                    The row-wise methods are kept as a reference implementation and give the same results.
     """
 
     def __init__(
@@ -177,12 +186,15 @@ class TemperatureScore(PortfolioAggregation):
         aggregation_method: PortfolioAggregationMethod = PortfolioAggregationMethod.WATS,
         grouping: Optional[List] = None,
         config: Type[TemperatureScoreConfig] = TemperatureScoreConfig,
+        vectorized: bool = True,
     ):
         super().__init__(config)
         self.model = model
+        self.vectorized = vectorized
         self.c: Type[TemperatureScoreConfig] = config
         self.scenario: Optional[Scenario] = scenario
         self.fallback_score = fallback_score
+        self._default_fallback_score = fallback_score
 
         self.time_frames = time_frames
         self.scopes = scopes
@@ -196,13 +208,32 @@ class TemperatureScore(PortfolioAggregation):
             self.grouping = grouping
 
         # Load the mappings from industry to SR15 goal
-        self.mapping = pd.read_excel(self.c.FILE_SR15_MAPPING, header=0)
-        self.regression_model = pd.read_excel(
-            self.c.FILE_REGRESSION_MODEL_SUMMARY, header=0
+        self._load_input_tables()
+
+    def _load_input_tables(self):
+        """
+        Load the SR15 mapping and the regression model from the process-wide input table cache.
+        """
+        self.mapping = INPUT_TABLES.get_sr15_mapping(self.c.FILE_SR15_MAPPING)
+        self.regression_model = INPUT_TABLES.get_regression_model(
+            self.c.FILE_REGRESSION_MODEL_SUMMARY, self.model, self.c.COLS.MODEL
         )
-        self.regression_model = self.regression_model[
-            self.regression_model[self.c.COLS.MODEL] == self.model
-        ]
+        self.regression_index = INPUT_TABLES.get_regression_index(
+            self.c.FILE_REGRESSION_MODEL_SUMMARY,
+            self.model,
+            self.c.COLS.MODEL,
+            self.c.COLS.VARIABLE,
+            self.c.COLS.SLOPE,
+        )
+
+    def reload_input_tables(self):
+        """
+        Parse the SR15 mapping and regression model files of the current config again, e.g. after they've been
+        replaced on disk or after the config has been pointed at different files.
+        """
+        INPUT_TABLES.invalidate(self.c.FILE_SR15_MAPPING)
+        INPUT_TABLES.invalidate(self.c.FILE_REGRESSION_MODEL_SUMMARY)
+        self._load_input_tables()
 
     def get_target_mapping(self, target: pd.Series) -> Optional[str]:
         """
@@ -229,6 +260,62 @@ class TemperatureScore(PortfolioAggregation):
                 self.c.ABSOLUTE_MAPPINGS.get(("other", target[self.c.COLS.SCOPE])),
             )
 
+    def get_target_mappings(self, data: pd.DataFrame) -> pd.Series:
+        """
+        Map all targets in a data frame onto an SR15 target (None if not available). This is the column-wise
+        equivalent of get_target_mapping.
+
+        :param data: The targets as a data frame
+        :return: The mapped SR15 targets
+        """
+        scopes = data[self.c.COLS.SCOPE].to_numpy(dtype=object)
+        is_intensity = (
+            data[self.c.COLS.TARGET_REFERENCE_NUMBER]
+            .astype(str)
+            .str.strip()
+            .str.lower()
+            .str.startswith(self.c.VALUE_TARGET_REFERENCE_INTENSITY_BASE)
+            .to_numpy(dtype=bool)
+        )
+
+        # Only first 3 characters of ISIC code are relevant for the absolute mappings
+        try:
+            isic_prefix = (
+                data[self.c.COLS.COMPANY_ISIC].str[:3].fillna("other").to_numpy(dtype=object)
+            )
+        except AttributeError:
+            # None of the ISIC codes is a string
+            isic_prefix = np.full(len(data), "other", dtype=object)
+
+        intensity = self._lookup_mapping(
+            self.c.INTENSITY_MAPPINGS,
+            data[self.c.COLS.INTENSITY_METRIC].to_numpy(dtype=object),
+            scopes,
+        )
+        absolute = self._lookup_mapping(self.c.ABSOLUTE_MAPPINGS, isic_prefix, scopes)
+        absolute_other = self._lookup_mapping(
+            self.c.ABSOLUTE_MAPPINGS, np.full(len(data), "other", dtype=object), scopes
+        )
+        absolute = np.where(pd.isnull(absolute), absolute_other, absolute)
+        return pd.Series(
+            np.where(is_intensity, intensity, absolute), index=data.index
+        )
+
+    @staticmethod
+    def _lookup_mapping(mapping: dict, keys: np.ndarray, scopes: np.ndarray) -> np.ndarray:
+        """
+        Look up (key, scope) pairs in one of the SR15 mapping dictionaries.
+
+        :param mapping: The mapping, keyed on (key, scope) tuples
+        :param keys: The first element of the lookup keys
+        :param scopes: The scopes to look up
+        :return: The mapped values, None where the pair isn't in the mapping
+        """
+        mapping_index = pd.MultiIndex.from_tuples(list(mapping.keys()))
+        mapping_values = np.array(list(mapping.values()) + [None], dtype=object)
+        positions = mapping_index.get_indexer(pd.MultiIndex.from_arrays([keys, scopes]))
+        return mapping_values[positions]
+
     def get_annual_reduction_rate(self, target: pd.Series) -> Optional[float]:
         """
         Get the annual reduction rate (or None if not available).
@@ -266,6 +353,25 @@ class TemperatureScore(PortfolioAggregation):
         )
         # End of BBGs code
 
+    def get_annual_reduction_rates(self, data: pd.DataFrame) -> pd.Series:
+        """
+        Get the annual reduction rate for all targets in a data frame (NaN if not available). This is the column-wise
+        equivalent of get_annual_reduction_rate.
+
+        :param data: The targets as a data frame
+        :return: The annual reduction rates
+        """
+        reduction_ambition = data[self.c.COLS.REDUCTION_AMBITION].astype(float)
+        end_year = data[self.c.COLS.END_YEAR].astype(float)
+        base_year = data[self.c.COLS.BASE_YEAR].astype(float)
+        invalid = (
+            reduction_ambition.isnull()
+            | end_year.isnull()
+            | base_year.isnull()
+            | (end_year <= base_year)
+        )
+        return (reduction_ambition / (end_year - base_year)).where(~invalid)
+
     def get_regression(
         self, target: pd.Series
     ) -> Tuple[Optional[float], Optional[float]]:
@@ -305,6 +411,9 @@ class TemperatureScore(PortfolioAggregation):
         :param data: The data to merge
         :return: The data set, amended with the regression parameters
         """
+        if self.vectorized:
+            return self._gather_regression(data)
+
         data[self.c.COLS.SLOPE] = data.apply(
             lambda row: self.c.SLOPE_MAP.get(row[self.c.COLS.TIME_FRAME], None), axis=1
         )
@@ -316,6 +425,33 @@ class TemperatureScore(PortfolioAggregation):
             how="left",
         )
 
+    def _gather_regression(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Amend the data with the regression parameters from the SBTi model, by looking up the position of each target's
+        (SR15 variable, slope) pair in the regression model index and gathering the columns of the regression model on
+        those positions. This gives the same result as _merge_regression's left merge, without the join.
+
+        :param data: The data to amend
+        :return: The data set, amended with the regression parameters
+        """
+        data = data.reset_index(drop=True)
+        data[self.c.COLS.SLOPE] = data[self.c.COLS.TIME_FRAME].map(self.c.SLOPE_MAP)
+        positions = self.regression_index.get_positions(
+            data[self.c.COLS.SR15], data[self.c.COLS.SLOPE]
+        )
+        found = positions >= 0
+        for column in self.regression_model.columns:
+            if column == self.c.COLS.SLOPE:
+                continue
+            values = self.regression_model[column].to_numpy()
+            if len(values) == 0:
+                data[column] = np.nan
+                continue
+            data[column] = pd.Series(
+                values[np.where(found, positions, 0)], index=data.index
+            ).where(found)
+        return data
+
     def get_score(self, target: pd.Series) -> Tuple[float, float]:
         """
         Get the temperature score for a certain target based on the annual reduction rate and the regression parameters.
@@ -346,6 +482,38 @@ class TemperatureScore(PortfolioAggregation):
                 0,
             )
 
+    def get_scores(self, data: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """
+        Get the temperature score and temperature result for all targets in a data frame. This is the column-wise
+        equivalent of get_score.
+
+        :param data: The targets as a data frame, amended with the regression parameters
+        :return: The temperature scores and the temperature results (1 if the fallback score was used, 0 otherwise)
+        """
+        param = data[self.c.COLS.REGRESSION_PARAM].to_numpy(dtype=float)
+        intercept = data[self.c.COLS.REGRESSION_INTERCEPT].to_numpy(dtype=float)
+        annual_reduction_rate = data[self.c.COLS.ANNUAL_REDUCTION_RATE].to_numpy(
+            dtype=float
+        )
+        use_fallback = (
+            np.isnan(param) | np.isnan(intercept) | np.isnan(annual_reduction_rate)
+        )
+
+        ts = np.maximum(
+            param * annual_reduction_rate * 100 + intercept,
+            self.c.TEMPERATURE_FLOOR,
+        )
+        sbti_validated = data[self.c.COLS.SBTI_VALIDATED].to_numpy(dtype=object).astype(bool)
+        ts = np.where(
+            sbti_validated,
+            ts,
+            ts * self.c.SBTI_FACTOR + self.fallback_score * (1 - self.c.SBTI_FACTOR),
+        )
+        return (
+            pd.Series(np.where(use_fallback, self.fallback_score, ts), index=data.index),
+            pd.Series(np.where(use_fallback, 1, 0), index=data.index),
+        )
+
     def get_ghc_temperature_score(
         self, row: pd.Series, company_data: pd.DataFrame
     ) -> Tuple[float, float]:
@@ -409,6 +577,65 @@ class TemperatureScore(PortfolioAggregation):
         except ZeroDivisionError:
             raise ValueError("The mean of the S1+S2 plus the S3 emissions is zero")
 
+    def get_ghc_temperature_scores(
+        self, data: pd.DataFrame, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Get the aggregated temperature score and temperature result for all s1s2s3 rows in a data frame. This is the
+        column-wise equivalent of get_ghc_temperature_score: the S1+S2 and S3 rows are pivoted next to each other per
+        company and time frame, after which the S3 threshold and the emissions weighting are applied in one pass.
+
+        :param data: The data set, containing the S1+S2 and S3 rows next to the S1+S2+S3 rows
+        :param columns: The columns to aggregate (defaults to the temperature score and temperature results)
+        :return: The data frame, with an updated s1s2s3 temperature score
+        """
+        if columns is None:
+            columns = [self.c.COLS.TEMPERATURE_SCORE, self.c.TEMPERATURE_RESULTS]
+        is_s1s2s3 = (data[self.c.COLS.SCOPE] == EScope.S1S2S3).to_numpy(dtype=bool)
+        if not is_s1s2s3.any():
+            return data
+
+        keys = [self.c.COLS.COMPANY_ID, self.c.COLS.TIME_FRAME]
+        company_data = (
+            data[
+                keys
+                + [self.c.COLS.SCOPE, self.c.COLS.GHG_SCOPE12, self.c.COLS.GHG_SCOPE3]
+                + columns
+            ]
+            .groupby(keys + [self.c.COLS.SCOPE])
+            .mean()
+            .unstack(self.c.COLS.SCOPE)
+            .reindex(pd.MultiIndex.from_frame(data.loc[is_s1s2s3, keys]))
+        )
+
+        def get_values(column: str, scope: EScope) -> np.ndarray:
+            if (column, scope) not in company_data.columns:
+                return np.full(len(company_data), np.nan)
+            return company_data[(column, scope)].to_numpy(dtype=float)
+
+        ghg_s1s2 = get_values(self.c.COLS.GHG_SCOPE12, EScope.S1S2)
+        ghg_s3 = get_values(self.c.COLS.GHG_SCOPE3, EScope.S3)
+        company_emissions = ghg_s1s2 + ghg_s3
+
+        # Keep the original score if ghg scope12 or 3 is empty (or the S1+S2 or S3 row is missing altogether)
+        use_original = np.isnan(ghg_s1s2) | np.isnan(ghg_s3)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # If the s3 emissions are less than 40 percent, we'll ignore them altogether, if not, we'll weigh them
+            ignore_s3 = ghg_s3 / company_emissions < 0.4
+            for column in columns:
+                s1s2 = get_values(column, EScope.S1S2)
+                weighted = (
+                    s1s2 * ghg_s1s2 + get_values(column, EScope.S3) * ghg_s3
+                ) / company_emissions
+                values = data[column].to_numpy(dtype=float, copy=True)
+                values[is_s1s2s3] = np.where(
+                    use_original,
+                    values[is_s1s2s3],
+                    np.where(ignore_s3, s1s2, weighted),
+                )
+                data[column] = values
+        return data
+
     def get_default_score(self, target: pd.Series) -> int:
         """
         Get the temperature score for a certain target based on the annual reduction rate and the regression parameters.
@@ -428,6 +655,16 @@ class TemperatureScore(PortfolioAggregation):
         """
         Prepare the data such that it can be used to calculate the temperature score.
 
+        :param data: The original data set as a pandas data frame
+        :return: The extended data frame
+        """
+        return self._score_targets(self._merge_regression(self._prepare_targets(data)))
+
+    def _prepare_targets(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Prepare the part of the data that doesn't depend on the scenario or the regression model: filter the requested
+        scopes and time frames, map the targets onto the SR15 targets and calculate the annual reduction rates.
+
         :param data: The original data set as a pandas data frame
         :return: The extended data frame
         """
@@ -438,6 +675,7 @@ class TemperatureScore(PortfolioAggregation):
         if EScope.S1S2S3 in scopes and EScope.S3 not in scopes:
             scopes.append(EScope.S3)
 
+        data = self._fill_sparse_grid(data, scopes)
         data = data[
             data[self.c.COLS.SCOPE].isin(scopes)
             & data[self.c.COLS.TIME_FRAME].isin(self.time_frames)
@@ -446,17 +684,90 @@ class TemperatureScore(PortfolioAggregation):
         data[self.c.COLS.TARGET_REFERENCE_NUMBER] = data[
             self.c.COLS.TARGET_REFERENCE_NUMBER
         ].fillna(self.c.VALUE_TARGET_REFERENCE_ABSOLUTE)
-        data[self.c.COLS.SR15] = data.apply(
-            lambda row: self.get_target_mapping(row), axis=1
+        if self.vectorized:
+            data[self.c.COLS.SR15] = self.get_target_mappings(data)
+            data[self.c.COLS.ANNUAL_REDUCTION_RATE] = self.get_annual_reduction_rates(
+                data
+            )
+        else:
+            data[self.c.COLS.SR15] = data.apply(
+                lambda row: self.get_target_mapping(row), axis=1
+            )
+            data[self.c.COLS.ANNUAL_REDUCTION_RATE] = data.apply(
+                lambda row: self.get_annual_reduction_rate(row), axis=1
+            )
+        return data
+
+    def _fill_sparse_grid(self, data: pd.DataFrame, scopes: List[EScope]) -> pd.DataFrame:
+        """
+        Fill out a sparse 9-box grid (see TargetProtocol), for the time frames and scopes that are calculated. Each
+        company with a marker row (a row that's flagged in the grid marker column) gets a copy of its marker row for
+        every cell it doesn't have a target for, which scores the fallback score like the empty cells of the full grid.
+        The rows of each company are sorted in the order of the full grid. Data without the grid marker column isn't a
+        sparse grid and is returned as it is.
+
+        :param data: The data set
+        :param scopes: The scopes to calculate
+        :return: The data set, with a row for every cell of the companies with a marker row
+        """
+        if self.c.COLS.GRID_MARKER not in data.columns:
+            return data
+        is_marker = data[self.c.COLS.GRID_MARKER].eq(True).to_numpy()
+        data = data.drop(columns=self.c.COLS.GRID_MARKER)
+
+        markers = data[is_marker]
+        companies = pd.Index(data[self.c.COLS.COMPANY_ID].unique())
+        time_frame_order = pd.Index(list(ETimeFrames))
+        scope_order = pd.Index(EScope.get_result_scopes())
+        cells = pd.MultiIndex.from_product(
+            [
+                time_frame_order[time_frame_order.isin(self.time_frames)],
+                scope_order[scope_order.isin(scopes)],
+            ]
         )
-        data[self.c.COLS.ANNUAL_REDUCTION_RATE] = data.apply(
-            lambda row: self.get_annual_reduction_rate(row), axis=1
+        filled = markers.iloc[np.repeat(np.arange(len(markers)), len(cells))].copy()
+        filled[self.c.COLS.TIME_FRAME] = np.tile(
+            cells.get_level_values(0).to_numpy(dtype=object), len(markers)
         )
-        data = self._merge_regression(data)
-        # TODO: Move temperature result to cols
-        data[self.c.COLS.TEMPERATURE_SCORE], data[self.c.TEMPERATURE_RESULTS] = zip(
-            *data.apply(lambda row: self.get_score(row), axis=1)
+        filled[self.c.COLS.SCOPE] = np.tile(
+            cells.get_level_values(1).to_numpy(dtype=object), len(markers)
         )
+        keys = [self.c.COLS.COMPANY_ID, self.c.COLS.TIME_FRAME, self.c.COLS.SCOPE]
+        targets = data[~is_marker]
+        filled = filled[
+            ~pd.MultiIndex.from_frame(filled[keys]).isin(
+                pd.MultiIndex.from_frame(targets[keys])
+            )
+        ]
+
+        data = pd.concat([targets, filled], ignore_index=True)
+        return data.iloc[
+            np.lexsort(
+                (
+                    scope_order.get_indexer(data[self.c.COLS.SCOPE]),
+                    time_frame_order.get_indexer(data[self.c.COLS.TIME_FRAME]),
+                    companies.get_indexer(data[self.c.COLS.COMPANY_ID]),
+                )
+            )
+        ]
+
+    def _score_targets(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate the temperature score of the prepared targets and cap them according to the scenario.
+
+        :param data: The data set, as returned by _merge_regression
+        :return: The data set, amended with the temperature scores
+        """
+        if self.vectorized:
+            (
+                data[self.c.COLS.TEMPERATURE_SCORE],
+                data[self.c.TEMPERATURE_RESULTS],
+            ) = self.get_scores(data)
+        else:
+            # TODO: Move temperature result to cols
+            data[self.c.COLS.TEMPERATURE_SCORE], data[self.c.TEMPERATURE_RESULTS] = zip(
+                *data.apply(lambda row: self.get_score(row), axis=1)
+            )
 
         data = self.cap_scores(data)
         return data
@@ -468,6 +779,9 @@ class TemperatureScore(PortfolioAggregation):
         :param data: The original data set as a pandas data frame
         :return: The data frame, with an updated s1s2s3 temperature score
         """
+        if self.vectorized:
+            return self.get_ghc_temperature_scores(data)
+
         # Calculate the GHC
         company_data = (
             data[
@@ -513,16 +827,162 @@ class TemperatureScore(PortfolioAggregation):
             relative to the reporting year. When None, defaults to today's date.
         :return: A data frame containing all relevant information for the targets and companies
         """
+        data = self._get_data(data, data_providers, portfolio, reporting_date)
+        return self._finalize_scores(self._prepare_data(data))
+
+    def calculate_scenarios(
+        self,
+        scenarios: List[Optional[Scenario]],
+        data: Optional[pd.DataFrame] = None,
+        data_providers: Optional[List[data.DataProvider]] = None,
+        portfolio: Optional[List[PortfolioCompany]] = None,
+        reporting_date: Optional[datetime.datetime] = None,
+        aggregate: bool = True,
+    ) -> List[Tuple[pd.DataFrame, Optional[ScoreAggregations]]]:
+        """
+        Calculate the temperature scores (and their aggregations) for a number of scenarios at once. The part of the
+        calculation that doesn't depend on the scenario (target mapping, annual reduction rates and regression
+        parameters) is only done once, after which only the scores, the fallback score and the caps are calculated per
+        scenario. The scenario that was passed to the constructor is ignored.
+
+        :param scenarios: The scenarios to calculate (None to calculate the scores without a scenario)
+        :param data: The data set (or None if the data should be retrieved)
+        :param data_providers: A list of DataProvider instances. Optional, only required if data is empty.
+        :param portfolio: A list of PortfolioCompany models. Optional, only required if data is empty.
+        :param reporting_date: Optional reporting date for target validation and time-frame classification.
+        :param aggregate: Whether to aggregate the scores or not
+        :return: The scores and the aggregations (None if aggregate is False) for each of the scenarios, in order
+        """
+        data = self._merge_regression(
+            self._prepare_targets(
+                self._get_data(data, data_providers, portfolio, reporting_date)
+            )
+        )
+
+        results = []
+        for scenario in scenarios:
+            temperature_score = self.with_scenario(scenario)
+            scores = temperature_score._finalize_scores(
+                temperature_score._score_targets(data.copy())
+            )
+            aggregations = None
+            if aggregate:
+                aggregations = temperature_score.aggregate_scores(scores)
+            results.append((scores, aggregations))
+        return results
+
+    def calculate_models(
+        self,
+        models: Optional[List[int]] = None,
+        data: Optional[pd.DataFrame] = None,
+        data_providers: Optional[List[data.DataProvider]] = None,
+        portfolio: Optional[List[PortfolioCompany]] = None,
+        reporting_date: Optional[datetime.datetime] = None,
+    ) -> pd.DataFrame:
+        """
+        Calculate the temperature scores for a number of regression models at once. The targets are only prepared once,
+        after which the regression parameters of each model are gathered and the scores are calculated per model. The
+        model that was passed to the constructor is ignored.
+
+        :param models: The regression models to calculate (None for all models in the regression model summary)
+        :param data: The data set (or None if the data should be retrieved)
+        :param data_providers: A list of DataProvider instances. Optional, only required if data is empty.
+        :param portfolio: A list of PortfolioCompany models. Optional, only required if data is empty.
+        :param reporting_date: Optional reporting date for target validation and time-frame classification.
+        :return: The temperature scores of all models in long format, the model is in the model column
+        """
+        if models is None:
+            regression_model = INPUT_TABLES.get_regression_model(
+                self.c.FILE_REGRESSION_MODEL_SUMMARY
+            )
+            models = sorted(regression_model[self.c.COLS.MODEL].dropna().unique())
+
+        data = self._prepare_targets(
+            self._get_data(data, data_providers, portfolio, reporting_date)
+        )
+
+        scores = []
+        for model in models:
+            temperature_score = self.with_model(model)
+            model_scores = temperature_score._finalize_scores(
+                temperature_score._score_targets(
+                    temperature_score._merge_regression(data.copy())
+                )
+            )
+            # Targets without regression parameters don't get a model from the merge
+            model_scores[self.c.COLS.MODEL] = model
+            scores.append(model_scores)
+        return pd.concat(scores, ignore_index=True)
+
+    def with_model(self, model: int) -> "TemperatureScore":
+        """
+        Get a copy of this temperature score instance that uses a different regression model. The copy gets its input
+        tables from the process-wide cache.
+
+        :param model: The regression model to use
+        :return: The temperature score instance for the regression model
+        """
+        temperature_score = copy.copy(self)
+        temperature_score.model = model
+        temperature_score._load_input_tables()
+        return temperature_score
+
+    def with_scenario(self, scenario: Optional[Scenario]) -> "TemperatureScore":
+        """
+        Get a copy of this temperature score instance that plays a different scenario. The copy shares the input tables
+        with this instance.
+
+        :param scenario: The scenario to play (None for no scenario)
+        :return: The temperature score instance for the scenario
+        """
+        temperature_score = copy.copy(self)
+        temperature_score.scenario = scenario
+        temperature_score.fallback_score = self._default_fallback_score
+        if scenario is not None:
+            temperature_score.fallback_score = scenario.get_fallback_score(
+                self._default_fallback_score
+            )
+        return temperature_score
+
+    def _get_data(
+        self,
+        data: Optional[pd.DataFrame],
+        data_providers: Optional[List[data.DataProvider]],
+        portfolio: Optional[List[PortfolioCompany]],
+        reporting_date: Optional[datetime.datetime],
+    ) -> pd.DataFrame:
+        """
+        Get the data set to calculate the temperature scores for, retrieving it from the data providers if required.
+
+        :param data: The data set (or None if the data should be retrieved)
+        :param data_providers: A list of DataProvider instances. Optional, only required if data is empty.
+        :param portfolio: A list of PortfolioCompany models. Optional, only required if data is empty.
+        :param reporting_date: Optional reporting date for target validation and time-frame classification.
+        :return: The data set
+        """
         if data is None:
             if data_providers is not None and portfolio is not None:
-                data = utils.get_data(data_providers, portfolio, reporting_date=reporting_date)
+                # Only the requested scopes and time frames are needed, so the others aren't graded at all
+                data = utils.get_data(
+                    data_providers,
+                    portfolio,
+                    reporting_date=reporting_date,
+                    scopes=self.scopes,
+                    time_frames=self.time_frames,
+                )
             else:
                 raise ValueError(
                     "You need to pass and either a data set or a list of data providers and companies"
                 )
+        return data
 
-        data = self._prepare_data(data)
+    def _finalize_scores(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate the S1+S2+S3 scores, drop the scopes that were only needed for that and round the scores.
 
+        :param data: The data set, as returned by _prepare_data
+        :return: The final temperature scores
+        """
         if EScope.S1S2S3 in self.scopes:
             # self._check_column(data, self.c.COLS.GHG_SCOPE12)
             # self._check_column(data, self.c.COLS.GHG_SCOPE3)
@@ -621,13 +1081,104 @@ class TemperatureScore(PortfolioAggregation):
         else:
             return None
 
-    def aggregate_scores(self, data: pd.DataFrame) -> ScoreAggregations:
+    def _get_grouped_aggregations(
+        self, data: pd.DataFrame, top_contributors: Optional[int] = None
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Aggregate the scores of all time frame-scope combinations, and of all groups within them, in one pass. Every
+        (time frame, scope) aggregation and every (time frame, scope, group) aggregation is a group of rows for
+        _calculate_aggregate_scores, so the weights of all of them are calculated column-wise at once.
+
+        :param data: The results of the calculate method
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them)
+        :return: The aggregations (one row per time frame, scope and group, where the group is None for the aggregation
+            over the whole time frame-scope combination) and the contributions of the companies to them. The
+            contributions of an aggregation are in the rows between its contributions start and stop position, sorted
+            on their relative contribution.
+        """
+        return self._get_grouped_aggregations_per_method(
+            data, [self.aggregation_method], top_contributors
+        )[0]
+
+    def _get_grouped_aggregations_per_method(
+        self,
+        data: pd.DataFrame,
+        aggregation_methods: List[PortfolioAggregationMethod],
+        top_contributors: Optional[int] = None,
+    ) -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Aggregate the scores of all time frame-scope combinations and groups in one pass (see
+        _get_grouped_aggregations), for a number of portfolio aggregation methods. The groups, the columns and the
+        checks are shared between the methods.
+
+        :param data: The results of the calculate method
+        :param aggregation_methods: The portfolio aggregation methods to use
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them)
+        :return: The aggregations and the contributions, per method
+        """
+        groups = self._get_aggregation_groups(
+            data, self.time_frames, self.scopes, self.grouping
+        )
+        if groups is None:
+            return [self._get_empty_grouped_aggregations() for _ in aggregation_methods]
+        data, input_columns = self._get_contribution_inputs(data, top_contributors)
+        return [
+            self._build_grouped_aggregations(
+                data, groups, *weighted_columns, top_contributors=top_contributors
+            )
+            for weighted_columns in self._calculate_aggregate_scores_per_method(
+                data,
+                input_columns,
+                aggregation_methods,
+                groups.positions,
+                groups.aggregation_index,
+            )
+        ]
+
+    def _get_contribution_inputs(
+        self, data: pd.DataFrame, top_contributors: Optional[int]
+    ) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Get the columns that need to be weighted to build the aggregations and their contributions. If only the top
+        contributors are kept, the weights themselves are needed as well, to calculate the temperature score of the
+        other companies. These are the weighted values of a column of ones.
+
+        :param data: The data to aggregate
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them)
+        :return: The data (with the column of ones, if needed) and the columns to weigh
+        """
+        input_columns = [self.c.COLS.TEMPERATURE_SCORE, self.c.TEMPERATURE_RESULTS]
+        if top_contributors is None:
+            return data, input_columns
+        data = data.assign(**{self.c.COLS.PORTFOLIO_WEIGHT: 1.0})
+        return data, input_columns + [self.c.COLS.PORTFOLIO_WEIGHT]
+
+    def aggregate_scores(
+        self,
+        data: pd.DataFrame,
+        columnar: bool = False,
+        top_contributors: Optional[int] = None,
+    ) -> Union[ScoreAggregations, ColumnarScoreAggregations]:
         """
         Aggregate scores to create a portfolio score per time_frame (short, mid, long).
 
         :param data: The results of the calculate method
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations, which keep the contributions
+            in a data frame and only build the pydantic models when they're serialized
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them). The
+            other companies of an aggregation are summed up into a single contribution (named after the
+            OTHER_CONTRIBUTIONS constant, without a company ID) that comes last, with the weighted average temperature
+            score of those companies. It's left out if the other companies have neither weight nor contribution.
         :return: A weighted temperature score for the portfolio
         """
+        if self.vectorized or columnar or top_contributors is not None:
+            score_aggregations = ColumnarScoreAggregations(
+                *self._get_grouped_aggregations(data, top_contributors),
+                time_frames=self.time_frames,
+                scopes=self.scopes,
+                config=self.c,
+            )
+            return score_aggregations if columnar else score_aggregations.to_model()
 
         score_aggregations = ScoreAggregations()
         for time_frame in self.time_frames:
@@ -640,6 +1191,277 @@ class TemperatureScore(PortfolioAggregation):
 
         return score_aggregations
 
+    def aggregate_scores_per_method(
+        self,
+        data: pd.DataFrame,
+        aggregation_methods: List[PortfolioAggregationMethod],
+        columnar: bool = False,
+        top_contributors: Optional[int] = None,
+    ) -> Dict[
+        PortfolioAggregationMethod, Union[ScoreAggregations, ColumnarScoreAggregations]
+    ]:
+        """
+        Aggregate scores to create a portfolio score per time_frame (short, mid, long), for a number of portfolio
+        aggregation methods at once. This gives the same results as calling aggregate_scores once per method, but the
+        filtering, the checks of the columns and the scope masks and emissions are shared between the methods. The
+        aggregation method of this instance is ignored.
+
+        :param data: The results of the calculate method
+        :param aggregation_methods: The portfolio aggregation methods to use
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them)
+        :return: The weighted temperature scores for the portfolio, per aggregation method
+        """
+        score_aggregations = {}
+        for aggregation_method, (aggregations, contributions) in zip(
+            aggregation_methods,
+            self._get_grouped_aggregations_per_method(
+                data, aggregation_methods, top_contributors
+            ),
+        ):
+            columnar_score_aggregations = ColumnarScoreAggregations(
+                aggregations,
+                contributions,
+                time_frames=self.time_frames,
+                scopes=self.scopes,
+                config=self.c,
+            )
+            score_aggregations[aggregation_method] = (
+                columnar_score_aggregations
+                if columnar
+                else columnar_score_aggregations.to_model()
+            )
+        return score_aggregations
+
+    def partial_aggregate_scores(
+        self,
+        data: pd.DataFrame,
+        aggregation_methods: Optional[List[PortfolioAggregationMethod]] = None,
+        contributions: bool = True,
+    ) -> PartialScoreAggregations:
+        """
+        Partially aggregate the scores of a shard of a portfolio, e.g. in a separate process. The partial aggregations
+        of all shards can be merged and finalized into the score aggregations of the whole portfolio:
+
+            partials = [temperature_score.partial_aggregate_scores(shard) for shard in shards]
+            aggregations = functools.reduce(PartialScoreAggregations.merge, partials).finalize()
+
+        The results aren't always bit for bit the same as those of aggregate_scores. The denominators of the weights
+        are summed per shard before they're added up, and without contributions the weighted scores are summed before
+        they're divided by the denominator, so the scores can differ in the last digits. A single unmerged shard with
+        contributions gives exactly the same results.
+
+        :param data: The results of the calculate method, for the companies in the shard
+        :param aggregation_methods: The portfolio aggregation methods to use (defaults to the method of this instance)
+        :param contributions: Whether to keep the companies of the shard, to report their contributions. Without
+            contributions, only the sums per time frame, scope and group are kept, so the size of the partial
+            aggregations (and the cost of merging them) doesn't depend on the number of companies.
+        :return: The partial aggregations of the shard
+        """
+        if aggregation_methods is None:
+            aggregation_methods = [self.aggregation_method]
+        return self._partially_aggregate_scores(
+            data,
+            aggregation_methods,
+            self.time_frames,
+            self.scopes,
+            self.grouping,
+            contributions,
+        )
+
+    def aggregate_holdings(
+        self,
+        scores: pd.DataFrame,
+        holdings: Iterable[pd.DataFrame],
+        columnar: bool = False,
+    ) -> Union[ScoreAggregations, ColumnarScoreAggregations]:
+        """
+        Aggregate the scores of a portfolio whose holdings are streamed in chunks, e.g. lot-level rows from a custodian
+        feed. See HoldingsAggregator.
+
+        :param scores: The results of the calculate method for all companies that can be held
+        :param holdings: An iterable of data frames with the company_id, the investment_value and the grouping columns
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations
+        :return: A weighted temperature score for the portfolio
+        """
+        aggregator = HoldingsAggregator(self, scores)
+        for chunk in holdings:
+            aggregator.update(chunk)
+        return aggregator.finalize(columnar)
+
+    def aggregate_portfolios(
+        self,
+        scores: pd.DataFrame,
+        holdings: pd.DataFrame,
+        columnar: bool = False,
+        hierarchy: Optional[pd.DataFrame] = None,
+        top_contributors: Optional[int] = None,
+    ) -> Dict[Hashable, Union[ScoreAggregations, ColumnarScoreAggregations]]:
+        """
+        Aggregate the scores of a number of portfolios that draw on the same companies at once. The companies only have
+        to be scored once (by the calculate method), the holdings are the (sparse) weights of the companies in each
+        portfolio. All portfolios are aggregated in one pass, as if they were groups of a single portfolio, which gives
+        the same results as aggregating the scores of each portfolio separately.
+
+        Note that the HIGHEST_CONTRIBUTORS scenario depends on the weights in the portfolio, so the scores of a
+        portfolio with that scenario can't be shared with other portfolios.
+
+        :param scores: The results of the calculate method for all companies that are held by any of the portfolios
+        :param holdings: The holdings of all portfolios, with the portfolio_id, the company_id and the investment_value.
+            If the holdings contain the grouping columns they're used instead of the ones in the scores.
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations
+        :param hierarchy: An optional fund hierarchy (parent_portfolio_id, child_portfolio_id and weight), in which case
+            the portfolios are aggregated on their look-through holdings. Every fund in the hierarchy is aggregated, on
+            every level of the tree.
+        :param top_contributors: The number of contributions to keep per aggregation (None to keep all of them)
+        :return: The weighted temperature scores per portfolio, in the order of the portfolios in the holdings
+        """
+        holdings_columns = [
+            self.c.COLS.PORTFOLIO_ID,
+            self.c.COLS.COMPANY_ID,
+            self.c.COLS.INVESTMENT_VALUE,
+        ]
+        missing_columns = [
+            column for column in holdings_columns if column not in holdings.columns
+        ]
+        if len(missing_columns) > 0:
+            raise ValueError(
+                "The holdings are missing the following columns: {}".format(
+                    ", ".join(missing_columns)
+                )
+            )
+        holdings_columns += [
+            column for column in self.grouping if column in holdings.columns
+        ]
+        if hierarchy is not None:
+            holdings = self._get_look_through_holdings(
+                holdings[holdings_columns], hierarchy
+            )
+        # Only take the columns that are needed for the aggregation, as every score is repeated for each holding
+        score_columns = [
+            column
+            for column in [
+                self.c.COLS.COMPANY_ID,
+                self.c.COLS.COMPANY_NAME,
+                self.c.COLS.TIME_FRAME,
+                self.c.COLS.SCOPE,
+                self.c.COLS.TEMPERATURE_SCORE,
+                self.c.TEMPERATURE_RESULTS,
+                self.c.COLS.GHG_SCOPE12,
+                self.c.COLS.GHG_SCOPE3,
+                self.c.COLS.COMPANY_ENTERPRISE_VALUE,
+                self.c.COLS.CASH_EQUIVALENTS,
+                PortfolioAggregationMethod.get_value_column(
+                    self.aggregation_method, self.c.COLS
+                ),
+            ]
+            + self.grouping
+            if column in scores.columns and column not in holdings_columns[2:]
+        ]
+        data = pd.merge(
+            left=scores[list(dict.fromkeys(score_columns))],
+            right=holdings[holdings_columns],
+            how="inner",
+            on=self.c.COLS.COMPANY_ID,
+        )
+
+        portfolio_ids = pd.Index(holdings[self.c.COLS.PORTFOLIO_ID].unique())
+        groups = self._get_aggregation_groups(
+            data,
+            self.time_frames,
+            self.scopes,
+            self.grouping,
+            portfolio_ids.get_indexer(data[self.c.COLS.PORTFOLIO_ID]),
+        )
+        if groups is None:
+            portfolio_aggregations = [
+                self._get_empty_grouped_aggregations() for _ in portfolio_ids
+            ]
+        else:
+            data, input_columns = self._get_contribution_inputs(
+                data, top_contributors
+            )
+            weighted_columns = self._calculate_aggregate_scores(
+                data,
+                input_columns,
+                self.aggregation_method,
+                groups.positions,
+                groups.aggregation_index,
+            )
+            portfolio_aggregations = self._split_grouped_aggregations(
+                *self._build_grouped_aggregations(
+                    data, groups, *weighted_columns, top_contributors=top_contributors
+                ),
+                groups,
+                len(portfolio_ids),
+            )
+
+        score_aggregations = {}
+        for portfolio_id, (aggregations, contributions) in zip(
+            portfolio_ids, portfolio_aggregations
+        ):
+            columnar_score_aggregations = ColumnarScoreAggregations(
+                aggregations,
+                contributions,
+                time_frames=self.time_frames,
+                scopes=self.scopes,
+                config=self.c,
+            )
+            score_aggregations[portfolio_id] = (
+                columnar_score_aggregations
+                if columnar
+                else columnar_score_aggregations.to_model()
+            )
+        return score_aggregations
+
+    def aggregate_panel(
+        self, scores: Dict[Hashable, pd.DataFrame], holdings: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Aggregate the portfolio temperature scores of a fund at a number of holdings dates at once, e.g. for monthly
+        reporting. The company scores only have to be calculated once per reporting date, each holdings date uses the
+        scores of the latest reporting date on or before it. All holdings dates are aggregated in one pass, which gives
+        the same scores as aggregating the scores of each holdings date separately.
+
+        :param scores: The results of the calculate method per reporting date
+        :param holdings: The holdings panel: the investment value of each company (the index) at each holdings date (the
+            columns). Companies that aren't held at a certain date have a missing or zero investment value.
+        :return: The time series of the portfolio temperature scores, one row per holdings date and one column per time
+            frame and scope
+        """
+        data = self._get_panel_data(scores, holdings)
+        columns = pd.MultiIndex.from_tuples(
+            [
+                (time_frame.value, scope.name)
+                for time_frame in self.time_frames
+                for scope in self.scopes
+            ]
+        )
+        aggregated_scores = np.full((len(holdings.columns), len(columns)), np.nan)
+        groups = self._get_aggregation_groups(
+            data,
+            self.time_frames,
+            self.scopes,
+            [],
+            holdings.columns.get_indexer(data[self.c.COLS.HOLDINGS_DATE]),
+        )
+        if groups is not None:
+            (weighted_scores,) = self._calculate_aggregate_scores(
+                data,
+                [self.c.COLS.TEMPERATURE_SCORE],
+                self.aggregation_method,
+                groups.positions,
+                groups.aggregation_index,
+            )
+            aggregated_scores[
+                groups.portfolios, groups.cells % len(columns)
+            ] = self._sum_groups(weighted_scores, groups.starts, groups.ends)
+        return pd.DataFrame(
+            aggregated_scores,
+            index=holdings.columns.rename(self.c.COLS.HOLDINGS_DATE),
+            columns=columns,
+        )
+
     def cap_scores(self, scores: pd.DataFrame) -> pd.DataFrame:
         """
         Cap the temperature scores in the input data frame to a certain value, based on the scenario that's being used.
@@ -659,6 +1481,17 @@ class TemperatureScore(PortfolioAggregation):
             ] = scores.loc[score_based_on_target, self.c.COLS.TEMPERATURE_SCORE].apply(
                 lambda x: min(x, self.scenario.get_score_cap())
             )
+        elif (
+            self.scenario.scenario_type == ScenarioType.HIGHEST_CONTRIBUTORS
+            and self.vectorized
+        ):
+            score_cap = self.scenario.get_score_cap()
+            temperature_scores = scores[self.c.COLS.TEMPERATURE_SCORE].to_numpy()
+            scores[self.c.COLS.TEMPERATURE_SCORE] = np.where(
+                self._get_top_contributors(scores) & (score_cap < temperature_scores),
+                score_cap,
+                temperature_scores,
+            )
         elif self.scenario.scenario_type == ScenarioType.HIGHEST_CONTRIBUTORS:
             # Cap scores of 10 highest contributors per time frame-scope combination
             # TODO: Should this actually be per time-frame/scope combi? Aren't you engaging the company as a whole?
@@ -696,6 +1529,52 @@ class TemperatureScore(PortfolioAggregation):
             )
         return scores
 
+    def _get_top_contributors(
+        self, scores: pd.DataFrame, number_top_contributors: int = 10
+    ) -> np.ndarray:
+        """
+        Find the rows of the companies that are among the highest contributors to the portfolio score, per time frame-
+        scope combination. The contributions are calculated the same way as in aggregate_scores, but as arrays, without
+        building the aggregation models. Companies with equal contributions are ranked on their company ID.
+
+        :param scores: The data set with the temperature scores
+        :param number_top_contributors: The number of highest contributors per time frame-scope combination
+        :return: A boolean mask that selects the rows of the highest contributors
+        """
+        top_contributors = np.zeros(len(scores), dtype=bool)
+        company_names = scores[self.c.COLS.COMPANY_NAME]
+        for time_frame in self.time_frames:
+            for scope in self.scopes:
+                in_group = (
+                    (scores[self.c.COLS.TIME_FRAME] == time_frame)
+                    & (scores[self.c.COLS.SCOPE] == scope)
+                ).to_numpy()
+                if not in_group.any():
+                    continue
+                group = scores[in_group]
+                weighted_scores = self._calculate_aggregate_score(
+                    group.copy(), self.c.COLS.TEMPERATURE_SCORE, self.aggregation_method
+                ).to_numpy(dtype=float)
+                contributions = weighted_scores / (np.nansum(weighted_scores) / 100)
+
+                # Rank on descending contribution, with the missing contributions last
+                ranks = np.where(np.isnan(contributions), np.inf, -contributions)
+                if len(ranks) > number_top_contributors:
+                    threshold = np.partition(ranks, number_top_contributors - 1)[
+                        number_top_contributors - 1
+                    ]
+                    candidates = np.flatnonzero(ranks <= threshold)
+                else:
+                    candidates = np.arange(len(ranks))
+                company_ids = group[self.c.COLS.COMPANY_ID].to_numpy()
+                top = sorted(
+                    candidates, key=lambda i: (ranks[i], str(company_ids[i]))
+                )[:number_top_contributors]
+
+                top_names = group[self.c.COLS.COMPANY_NAME].iloc[top].dropna()
+                top_contributors[in_group] = company_names[in_group].isin(top_names).to_numpy()
+        return top_contributors
+
     def anonymize_data_dump(self, scores: pd.DataFrame) -> pd.DataFrame:
         """
         Anonymize the scores by deleting the company IDs, ISIN and renaming the companies.
@@ -712,3 +1591,88 @@ class TemperatureScore(PortfolioAggregation):
                 self.c.COLS.COMPANY_NAME,
             ] = "Company" + str(index + 1)
         return scores
+
+
+class HoldingsAggregator:
+    """
+    Aggregates the scores of a portfolio whose holdings come in as a stream of chunks, instead of a single data frame.
+    Only the running sum of the investment value per company (and combination of grouping values) is kept, so the
+    memory that's needed is bounded by the number of companies instead of the number of holdings. Holdings of the same
+    company are collapsed into a single position, so the contributions list every company once.
+
+    :param temperature_score: The temperature score instance whose settings are used to aggregate the scores
+    :param scores: The results of the calculate method for all companies that can be held. Its investment value and
+        grouping columns are ignored, they're taken from the holdings.
+    """
+
+    def __init__(self, temperature_score: TemperatureScore, scores: pd.DataFrame):
+        self.temperature_score = temperature_score
+        self.c = temperature_score.c
+        self.keys = [self.c.COLS.COMPANY_ID] + temperature_score.grouping
+        self.scores = scores.drop(
+            columns=[
+                column
+                for column in [self.c.COLS.INVESTMENT_VALUE]
+                + temperature_score.grouping
+                if column in scores.columns
+            ]
+        )
+        self.investment_values = pd.Series(
+            dtype=float,
+            index=pd.MultiIndex.from_arrays([[] for _ in self.keys], names=self.keys),
+            name=self.c.COLS.INVESTMENT_VALUE,
+        )
+
+    def update(self, holdings: pd.DataFrame):
+        """
+        Add a chunk of holdings to the running sums.
+
+        :param holdings: A data frame with the company_id, the investment_value and the grouping columns
+        """
+        missing_columns = [
+            column
+            for column in self.keys + [self.c.COLS.INVESTMENT_VALUE]
+            if column not in holdings.columns
+        ]
+        if len(missing_columns) > 0:
+            raise ValueError(
+                "The holdings are missing the following columns: {}".format(
+                    ", ".join(missing_columns)
+                )
+            )
+        investment_values = holdings.groupby(self.keys, dropna=False, sort=False)[
+            self.c.COLS.INVESTMENT_VALUE
+        ].sum()
+        if not isinstance(investment_values.index, pd.MultiIndex):
+            investment_values.index = pd.MultiIndex.from_arrays(
+                [investment_values.index], names=self.keys
+            )
+        self.investment_values = self.investment_values.add(
+            investment_values, fill_value=0
+        )
+
+    def get_portfolio_data(self) -> pd.DataFrame:
+        """
+        Get the scores of the companies that are held, with the investment values of the holdings so far.
+
+        :return: The scores of the held companies, in the same format as the results of the calculate method
+        """
+        return pd.merge(
+            left=self.scores,
+            right=self.investment_values.reset_index(),
+            how="inner",
+            on=self.c.COLS.COMPANY_ID,
+        )
+
+    def finalize(
+        self, columnar: bool = False
+    ) -> Union[ScoreAggregations, ColumnarScoreAggregations]:
+        """
+        Aggregate the scores of the holdings so far. More chunks can still be added afterwards.
+
+        :param columnar: Whether to return the aggregations as ColumnarScoreAggregations
+        :return: A weighted temperature score for the portfolio
+        """
+        return self.temperature_score.aggregate_scores(
+            self.get_portfolio_data(), columnar
+        )
@@ -1,7 +1,7 @@
 import logging
 import datetime
 import pandas as pd
-from typing import List, Optional, Tuple, Type, Dict
+from typing import Hashable, List, Optional, Tuple, Type, Dict
 
 from SBTi.configs import ColumnsConfig
 from SBTi.data.sbti import SBTi
@@ -11,7 +11,7 @@ from SBTi.interfaces import IDataProviderTarget, IDataProviderCompany
 from .interfaces import PortfolioCompany, EScope, ETimeFrames, ScoreAggregations
 from .target_validation import TargetProtocol
 
-from .temperature_score import Scenario, TemperatureScore
+from .temperature_score import Scenario, ScenarioType, TemperatureScore
 from .portfolio_aggregation import PortfolioAggregationMethod
 
 from . import data
@@ -226,6 +226,9 @@ def get_data(
     data_providers: List[data.DataProvider],
     portfolio: List[PortfolioCompany],
     reporting_date: Optional[datetime.datetime] = None,
+    sparse: bool = False,
+    scopes: Optional[List[EScope]] = None,
+    time_frames: Optional[List[ETimeFrames]] = None,
 ) -> pd.DataFrame:
     """
     Get the required data from the data provider(s), validate the targets and return a 9-box grid for each company.
@@ -239,6 +242,10 @@ def get_data(
         - Target validation checks end year against reporting_date instead of today
         - Time-frame classification (short/mid/long) is calculated relative to reporting_date
         When None, defaults to today's date.
+    :param sparse: Whether to return a sparse 9-box grid, with only the cells that have a target and a marker row per
+        company (see TargetProtocol). The TemperatureScore class fills out the other cells with the fallback score.
+    :param scopes: The scopes to create the grid for (None for all of them, see TargetProtocol)
+    :param time_frames: The time frames to create the grid for (None for all of them, see TargetProtocol)
     :return: A data frame containing the relevant company-target data
     """
     logger = logging.getLogger(__name__)
@@ -272,8 +279,14 @@ def get_data(
         logger.warning("No company data found in data providers. All companies will receive fallback score.")
 
     # Prepare the data - only call process if we have data
+    target_protocol = TargetProtocol(
+        reporting_date=reporting_date,
+        sparse=sparse,
+        scopes=scopes,
+        time_frames=time_frames,
+    )
     if len(target_data) > 0 and len(company_data) > 0:
-        portfolio_data = TargetProtocol(reporting_date=reporting_date).process(target_data, company_data)
+        portfolio_data = target_protocol.process(target_data, company_data)
     else:
         # Create empty DataFrame - companies will get fallback score
         portfolio_data = pd.DataFrame(columns=[ColumnsConfig.COMPANY_ID, ColumnsConfig.COMPANY_NAME])
@@ -291,34 +304,42 @@ def get_data(
         # Include all columns needed by _prepare_data in temperature_score.py
         # These rows will have null values that trigger the fallback score path
         placeholder_rows = []
+        grid_time_frames, grid_scopes = target_protocol.get_grid_cells()
         for company_id in companies_without_data:
             filtered = df_portfolio[df_portfolio[ColumnsConfig.COMPANY_ID] == company_id]
             if filtered.empty:
                 logger.warning(f"Company {company_id} not found in portfolio, skipping placeholder.")
                 continue
             company_info = filtered.iloc[0]
-            for scope in [EScope.S1S2, EScope.S3, EScope.S1S2S3]:
-                for time_frame in [ETimeFrames.SHORT, ETimeFrames.MID, ETimeFrames.LONG]:
-                    placeholder_rows.append({
-                        ColumnsConfig.COMPANY_ID: company_id,
-                        ColumnsConfig.COMPANY_NAME: company_info.get('company_name', 'Unknown'),
-                        ColumnsConfig.SCOPE: scope,
-                        ColumnsConfig.TIME_FRAME: time_frame,
-                        # Columns required by _prepare_data (strings required)
-                        ColumnsConfig.TARGET_REFERENCE_NUMBER: 'no_target',
-                        ColumnsConfig.COMPANY_ISIC: company_info.get(ColumnsConfig.COMPANY_ISIC, ''),
-                        ColumnsConfig.COMPANY_LEI: company_info.get(ColumnsConfig.COMPANY_LEI, ''),
-                        # Columns that will be null, triggering fallback score
-                        ColumnsConfig.REDUCTION_AMBITION: None,
-                        ColumnsConfig.BASE_YEAR: None,
-                        ColumnsConfig.END_YEAR: None,
-                        ColumnsConfig.SBTI_VALIDATED: False,
-                        ColumnsConfig.GHG_SCOPE12: None,
-                        ColumnsConfig.GHG_SCOPE3: None,
-                    })
+            # A sparse grid only needs a single marker row, without a scope and time frame
+            cells = [(None, None)] if sparse else [
+                (scope, time_frame)
+                for scope in grid_scopes
+                for time_frame in grid_time_frames
+            ]
+            for scope, time_frame in cells:
+                placeholder_rows.append({
+                    ColumnsConfig.COMPANY_ID: company_id,
+                    ColumnsConfig.COMPANY_NAME: company_info.get('company_name', 'Unknown'),
+                    ColumnsConfig.SCOPE: scope,
+                    ColumnsConfig.TIME_FRAME: time_frame,
+                    # Columns required by _prepare_data (strings required)
+                    ColumnsConfig.TARGET_REFERENCE_NUMBER: 'no_target',
+                    ColumnsConfig.COMPANY_ISIC: company_info.get(ColumnsConfig.COMPANY_ISIC, ''),
+                    ColumnsConfig.COMPANY_LEI: company_info.get(ColumnsConfig.COMPANY_LEI, ''),
+                    # Columns that will be null, triggering fallback score
+                    ColumnsConfig.REDUCTION_AMBITION: None,
+                    ColumnsConfig.BASE_YEAR: None,
+                    ColumnsConfig.END_YEAR: None,
+                    ColumnsConfig.SBTI_VALIDATED: False,
+                    ColumnsConfig.GHG_SCOPE12: None,
+                    ColumnsConfig.GHG_SCOPE3: None,
+                })
 
         if placeholder_rows:
             placeholder_df = pd.DataFrame(placeholder_rows)
+            if sparse:
+                placeholder_df[ColumnsConfig.GRID_MARKER] = True
             portfolio_data = pd.concat([portfolio_data, placeholder_df], ignore_index=True)
 
     portfolio_data = pd.merge(
@@ -374,3 +395,82 @@ def calculate(
         scores = ts.anonymize_data_dump(scores)
 
     return scores, aggregations
+
+
+def calculate_portfolios(
+    data_providers: List[data.DataProvider],
+    portfolios: Dict[Hashable, List[PortfolioCompany]],
+    fallback_score: float,
+    aggregation_method: PortfolioAggregationMethod,
+    grouping: Optional[List[str]],
+    scenario: Optional[Scenario],
+    time_frames: List[ETimeFrames],
+    scopes: List[EScope],
+    anonymize: bool,
+    reporting_date: Optional[datetime.datetime] = None,
+    hierarchy: Optional[pd.DataFrame] = None,
+) -> Tuple[pd.DataFrame, Dict[Hashable, ScoreAggregations]]:
+    """
+    Calculate the temperature scores of a number of portfolios that draw on an overlapping set of companies. The data of
+    the union of the companies is retrieved and scored only once, after which all portfolios are aggregated at once
+    (see TemperatureScore.aggregate_portfolios).
+
+    :param data_providers: A list of DataProvider instances
+    :param portfolios: The portfolios, a list of PortfolioCompany models per portfolio id
+    :param fallback_score: The fallback score to use while calculating the temperature score
+    :param aggregation_method: The aggregation method to use
+    :param grouping: The names of the columns to group on
+    :param scenario: The scenario to play (the highest contributors scenarios depend on the portfolio and can't be used)
+    :param time_frames: The time frames that the temperature scores should be calculated for
+    :param scopes: The scopes that the temperature scores should be calculated for
+    :param anonymize: Whether to anonymize the resulting data set or not
+    :param reporting_date: Optional reporting date for target validation and time-frame classification
+    :param hierarchy: An optional fund hierarchy (parent_portfolio_id, child_portfolio_id and weight), to aggregate
+        every fund on its look-through holdings. Funds of funds don't need to have any direct holdings.
+    :return: The scores of the union of the companies and the aggregations per portfolio id
+    """
+    if scenario is not None and scenario.scenario_type in [
+        ScenarioType.HIGHEST_CONTRIBUTORS,
+        ScenarioType.HIGHEST_CONTRIBUTORS_APPROVED,
+    ]:
+        raise ValueError(
+            "The highest contributors scenarios depend on the portfolio, so they can't be calculated for a number of "
+            "portfolios at once"
+        )
+
+    companies = {}
+    holdings = []
+    for portfolio_id, portfolio in portfolios.items():
+        for company in portfolio:
+            companies.setdefault(company.company_id, company)
+            holdings.append(
+                {
+                    **_flatten_user_fields(company),
+                    ColumnsConfig.PORTFOLIO_ID: portfolio_id,
+                }
+            )
+    portfolio_data = get_data(
+        data_providers,
+        list(companies.values()),
+        reporting_date,
+        scopes=scopes,
+        time_frames=time_frames,
+    )
+
+    ts = TemperatureScore(
+        time_frames=time_frames,
+        scopes=scopes,
+        fallback_score=fallback_score,
+        scenario=scenario,
+        grouping=grouping,
+        aggregation_method=aggregation_method,
+    )
+    scores = ts.calculate(portfolio_data)
+    aggregations = ts.aggregate_portfolios(
+        scores, pd.DataFrame.from_records(holdings), hierarchy=hierarchy
+    )
+
+    if anonymize:
+        scores = ts.anonymize_data_dump(scores)
+
+    return scores, aggregations
@@ -2,10 +2,18 @@ import SBTi.data
 from SBTi import utils
 from SBTi.data.excel import ExcelProvider 
 from SBTi.data.sbti import SBTi  
+from SBTi.configs import PortfolioCoverageTVPConfig
+from SBTi.interfaces import IDataProviderCompany
 
+import copy
+import datetime
 import os
+import tempfile
 import unittest
+from unittest import mock
+
 import pandas as pd
+import requests
 
 
 class TestSBTiData(unittest.TestCase):
@@ -61,6 +69,105 @@ class TestSBTiData(unittest.TestCase):
             # Check that the data is as expected
             self.assertEqual(len(company_data), 3)
 
+    def test_sbti_validity(self) -> None:
+        """
+        Test whether the validity matrix of a single CTA file gives the same results as filtering the CTA file on each
+        cutoff date separately.
+        """
+        config = PortfolioCoverageTVPConfig
+        sbti = SBTi.__new__(SBTi)
+        sbti.c = config
+        sbti.format_type = "old"
+        sbti.targets = pd.DataFrame(
+            {
+                config.COL_COMPANY_NAME: ["A", "B", "C", "D", "B"],
+                config.COL_COMPANY_ISIN: ["ISIN_A", None, "ISIN_C", "ISIN_D", "ISIN_B"],
+                config.COL_COMPANY_LEI: ["LEI_A", None, None, "LEI_D", "LEI_B"],
+                config.COL_ACTION: ["Target", "Target", "Target", "Commitment", "Target"],
+                config.COL_TARGET: ["Near-term"] * 5,
+                config.COL_DATE_PUBLISHED: [
+                    "2019-05-01",
+                    "2020-05-01",
+                    "2021-05-01",
+                    "2019-05-01",
+                    "2018-05-01",
+                ],
+            }
+        )
+        sbti._all_targets = sbti.targets
+        companies = [
+            IDataProviderCompany(company_id=company_id, company_name=company_id, isic="A")
+            for company_id in ["a", "b", "c", "d"]
+        ]
+        id_map = {
+            "a": ("ISIN_A", "LEI_A"),
+            "b": ("ISIN_B", "nan"),
+            "c": ("ISIN_C", "nan"),
+            "d": ("ISIN_D", "LEI_D"),
+        }
+        cutoff_dates = pd.to_datetime(["2018-12-31", "2019-12-31", "2020-12-31", "2021-12-31"])
+
+        validity = sbti.get_sbti_validity(companies, id_map, list(cutoff_dates))
+        for cutoff_date in cutoff_dates:
+            sbti_cutoff = SBTi.__new__(SBTi)
+            sbti_cutoff.c = config
+            sbti_cutoff.format_type = "old"
+            sbti_cutoff.cutoff_date = cutoff_date
+            sbti_cutoff.targets = sbti_cutoff._filter_by_date(sbti.targets.copy())
+            sbti_cutoff._all_targets = sbti.targets
+            expected = sbti_cutoff.get_companies(copy.deepcopy(companies), id_map)
+            self.assertEqual(
+                list(validity[cutoff_date]),
+                [company.sbti_validated for company in expected],
+            )
+        # The row of C is dropped by filter_cta_file, as its missing LEI is a duplicate of the one of the first B row
+        self.assertEqual(
+            validity.to_numpy().tolist(),
+            [
+                [False, True, True, True],
+                [True, True, True, True],
+                [False, False, False, False],
+                [False, False, False, False],
+            ],
+        )
+
+
+    def test_sbti_validity_after_cutoff_date(self) -> None:
+        """
+        Test whether the validity at a date after the cutoff date of the instance is taken from the whole CTA file,
+        rather than the part that was published before the cutoff date of the instance.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+
+            class Config(PortfolioCoverageTVPConfig):
+                FILE_TARGETS = os.path.join(directory, "cta.xlsx")
+
+            pd.DataFrame(
+                {
+                    Config.COL_COMPANY_NAME: ["A", "B"],
+                    Config.COL_COMPANY_ISIN: ["ISIN_A", "ISIN_B"],
+                    Config.COL_COMPANY_LEI: ["LEI_A", "LEI_B"],
+                    Config.COL_ACTION: ["Target", "Target"],
+                    Config.COL_TARGET: ["Near-term", "Near-term"],
+                    Config.COL_DATE_PUBLISHED: ["2020-05-01", "2022-05-01"],
+                }
+            ).to_excel(Config.FILE_TARGETS, index=False)
+            # Read the CTA file above instead of downloading the current one
+            with mock.patch(
+                "SBTi.data.sbti.requests.get",
+                side_effect=requests.exceptions.ConnectionError,
+            ):
+                sbti = SBTi(Config, cutoff_date=datetime.datetime(2021, 1, 1))
+
+        companies = [
+            IDataProviderCompany(company_id=company_id, company_name=company_id, isic="A")
+            for company_id in ["A", "B"]
+        ]
+        id_map = {"A": ("ISIN_A", "LEI_A"), "B": ("ISIN_B", "LEI_B")}
+        validity = sbti.get_sbti_validity(
+            companies, id_map, [datetime.datetime(2021, 1, 1), datetime.datetime(2023, 1, 1)]
+        )
+        self.assertEqual(validity.to_numpy().tolist(), [[True, True], [False, True]])
 
 if __name__ == "__main__":
     test = TestSBTiData()
@@ -206,6 +206,57 @@ class EndToEndTest(unittest.TestCase):
         # verify that results exist
         self.assertEqual(agg_scores.mid.S1S2.all.score, self.BASE_COMP_SCORE)
 
+    def test_calculate_portfolios(self):
+        """
+        Test whether scoring a number of portfolios at once gives the same results as scoring each of them separately.
+        """
+        companies, targets, pf_companies = self.create_base_companies(
+            ["A", "B", "C"]
+        )
+        targets[2].reduction_ambition = 0.3
+        portfolios = {
+            "fund 1": copy.deepcopy(pf_companies[:2]),
+            "fund 2": copy.deepcopy(pf_companies[1:]),
+        }
+        portfolios["fund 2"][0].investment_value = 300
+
+        temp_score = TemperatureScore(
+            time_frames=[ETimeFrames.MID],
+            scopes=[EScope.S1S2, EScope.S1S2S3],
+            aggregation_method=PortfolioAggregationMethod.WATS,
+        )
+        _, aggregations = SBTi.utils.calculate_portfolios(
+            data_providers=[TestDataProvider(companies=companies, targets=targets)],
+            portfolios=portfolios,
+            fallback_score=temp_score.fallback_score,
+            aggregation_method=temp_score.aggregation_method,
+            grouping=None,
+            scenario=None,
+            time_frames=temp_score.time_frames,
+            scopes=temp_score.scopes,
+            anonymize=False,
+        )
+        self.assertEqual(list(aggregations), list(portfolios))
+
+        for portfolio_id, portfolio in portfolios.items():
+            company_ids = [company.company_id for company in portfolio]
+            data_provider = TestDataProvider(
+                companies=[
+                    company
+                    for company in companies
+                    if company.company_id in company_ids
+                ],
+                targets=[
+                    target for target in targets if target.company_id in company_ids
+                ],
+            )
+            portfolio_data = SBTi.utils.get_data([data_provider], portfolio)
+            scores = temp_score.calculate(portfolio_data)
+            self.assertEqual(
+                aggregations[portfolio_id].model_dump(),
+                temp_score.aggregate_scores(scores).model_dump(),
+            )
+
     # Run some regression tests
     # @unittest.skip("only run for longer test runs")
     def test_regression_companies(self):
@@ -14,7 +14,9 @@ from SBTi.temperature_score import (
     TemperatureScore,
 )
 from SBTi.portfolio_aggregation import PortfolioAggregationMethod
+from SBTi.target_validation import TargetProtocol
 import copy
+import pandas as pd
 import SBTi
 from typing import List
 from SBTi.data.data_provider import DataProvider
@@ -232,6 +234,220 @@ class EdgeCasesTest(unittest.TestCase):
             "Good target should have been selected, not fallback",
         )
 
+    def test_vectorized_target_selection(self):
+        """
+        Verify that selecting the targets of the 9-box grid with a single sort
+        gives the same grid as selecting them cell by cell.
+        """
+        companies = [
+            copy.deepcopy(self.company_base),
+            self.company_base.model_copy(
+                update={"company_id": "NoTargets", "company_name": "NoTargets"}
+            ),
+        ]
+        targets = []
+        for coverage, end_year, base_year, target_type, ambition in [
+            (0.95, 2035, 2019, "abs", 0.8),
+            (0.95, 2035, 2019, "abs", float("nan")),
+            (0.95, 2035, 2019, "int", 0.5),
+            (0.95, 2035, 2018, "abs", 0.6),
+            (0.8, 2040, 2019, "abs", 0.7),
+            (0.95, 2028, 2019, "abs", 0.3),
+        ]:
+            for scope in [EScope.S1S2, EScope.S3]:
+                targets.append(
+                    self.target_base.model_copy(
+                        update={
+                            "scope": scope,
+                            "coverage_s1": coverage,
+                            "coverage_s2": coverage,
+                            "coverage_s3": coverage,
+                            "end_year": end_year,
+                            "base_year": base_year,
+                            "target_type": target_type,
+                            "reduction_ambition": ambition,
+                        }
+                    )
+                )
+
+        expected = TargetProtocol(vectorized=False).process(
+            copy.deepcopy(targets), companies
+        )
+        data = TargetProtocol().process(copy.deepcopy(targets), companies)
+        pd.testing.assert_frame_equal(data, expected)
+        self.assertEqual(len(data), 18)
+        self.assertEqual(data["reduction_ambition"].notna().sum(), 4)
+
+    def test_s1_s2_combination(self):
+        """
+        Verify that an S1 target is combined with the matching S2 target with
+        the highest coverage, and not with S2 targets with a different key.
+        """
+        s1 = self.target_base.model_copy(
+            update={"base_year_ghg_s1": 100, "base_year_ghg_s2": 100}
+        )
+        s2_low, s2_high, s2_other = [
+            self.target_base.model_copy(
+                update={
+                    "scope": EScope.S2,
+                    "coverage_s2": coverage,
+                    "reduction_ambition": 0.4,
+                    "base_year_ghg_s1": 100,
+                    "base_year_ghg_s2": 100,
+                    "end_year": end_year,
+                }
+            )
+            for coverage, end_year in [(0.5, 2035), (0.75, 2035), (1.0, 2040)]
+        ]
+
+        target_protocol = TargetProtocol()
+        targets = target_protocol.prepare_targets([s2_low, s1, s2_high, s2_other])
+        self.assertEqual(len(target_protocol.s2_index), 2)
+        combined = targets[1]
+        coverage = (0.95 * 100 + 0.75 * 100) / 200
+        self.assertEqual(combined.scope, EScope.S1S2)
+        self.assertAlmostEqual(combined.coverage_s1, coverage)
+        # The combined coverage is below 95%, so the boundary coverage scales the ambition
+        self.assertAlmostEqual(
+            combined.reduction_ambition,
+            (0.8 * 0.95 * 100 + 0.4 * 0.75 * 100) / (0.95 * 100 + 0.75 * 100) * coverage,
+        )
+
+    def test_target_data_pipeline(self):
+        """
+        Verify that processing the targets as a data frame gives the same
+        9-box grid as processing them one model at a time.
+        """
+        targets = [
+            self.target_base.model_copy(update=update)
+            for update in [
+                {"base_year_ghg_s1": 100, "base_year_ghg_s2": 50},
+                {
+                    "scope": EScope.S2,
+                    "coverage_s2": 0.8,
+                    "reduction_ambition": 0.5,
+                    "base_year_ghg_s1": 100,
+                    "base_year_ghg_s2": 50,
+                },
+                {
+                    "scope": EScope.S1S2S3,
+                    "coverage_s3": 0.5,
+                    "base_year_ghg_s3": 200,
+                    "end_year": 2045,
+                },
+                {"scope": EScope.S3, "coverage_s3": 0.9, "end_year": 2028},
+                {"target_type": "int"},
+                {"achieved_reduction": 1.0},
+            ]
+        ]
+        companies = [self.company_base]
+
+        expected = TargetProtocol(vectorized=False).process(
+            copy.deepcopy(targets), companies
+        )
+        target_data = pd.DataFrame.from_records([t.model_dump() for t in targets])
+        target_data["scope"] = target_data["scope"].map(lambda scope: scope.value)
+        data = TargetProtocol().process_data(
+            target_data,
+            pd.DataFrame.from_records([c.model_dump() for c in companies]),
+        )
+        pd.testing.assert_frame_equal(data, expected)
+        self.assertEqual(TargetProtocol().process(targets, companies).shape, data.shape)
+
+        with self.assertRaises(ValueError):
+            TargetProtocol().prepare_target_data(target_data.drop(columns=["end_year"]))
+
+    def test_sparse_grid(self):
+        """
+        Verify that a sparse 9-box grid only contains the cells with a target
+        and a marker row per company, and gives the same scores as the full
+        grid.
+        """
+        companies = [
+            self.company_base,
+            self.company_base.model_copy(
+                update={"company_id": "NoTargets", "company_name": "NoTargets", "ghg_s3": 50}
+            ),
+        ]
+        targets = [
+            self.target_base,
+            self.target_base.model_copy(
+                update={"scope": EScope.S3, "coverage_s3": 0.9, "end_year": 2045}
+            ),
+        ]
+        grid = TargetProtocol().process(copy.deepcopy(targets), companies)
+        sparse_grid = TargetProtocol(sparse=True).process(
+            copy.deepcopy(targets), companies
+        )
+        self.assertEqual(len(grid), 18)
+        self.assertEqual(len(sparse_grid), 4)
+        self.assertEqual(sparse_grid["scope"].isnull().sum(), 2)
+        self.assertEqual(sparse_grid["grid_marker"].sum(), 2)
+
+        for time_frames, scopes in [
+            (list(ETimeFrames), EScope.get_result_scopes()),
+            ([ETimeFrames.MID], [EScope.S1S2S3]),
+        ]:
+            temp_score = TemperatureScore(time_frames=time_frames, scopes=scopes)
+            for data in [grid, sparse_grid]:
+                data["investment_value"] = 100
+            scores = temp_score.calculate(grid)
+            pd.testing.assert_frame_equal(temp_score.calculate(sparse_grid), scores)
+
+    def test_dense_grid_without_scope(self):
+        """
+        Verify that a row without a time frame and scope in a full grid is
+        dropped, instead of being taken for a marker row of a sparse grid.
+        """
+        grid = TargetProtocol().process(
+            copy.deepcopy([self.target_base]), [self.company_base]
+        )
+        grid["investment_value"] = 100
+        row = grid.iloc[:1].copy()
+        row[["scope", "time_frame"]] = None
+
+        temp_score = TemperatureScore(
+            time_frames=list(ETimeFrames), scopes=EScope.get_result_scopes()
+        )
+        pd.testing.assert_frame_equal(
+            temp_score.calculate(pd.concat([grid, row], ignore_index=True)),
+            temp_score.calculate(grid),
+        )
+
+    def test_grid_pushdown(self):
+        """
+        Verify that the target protocol only creates the requested cells of
+        the grid, including the S1+S2 and S3 cells of an S1+S2+S3 request, and
+        that these give the same scores as the full grid.
+        """
+        targets = [
+            self.target_base,
+            self.target_base.model_copy(
+                update={"scope": EScope.S3, "coverage_s3": 0.9, "end_year": 2045}
+            ),
+        ]
+        grid = TargetProtocol().process(copy.deepcopy(targets), [self.company_base])
+        grid["investment_value"] = 100
+
+        for time_frames, scopes, cells in [
+            ([ETimeFrames.MID], [EScope.S1S2S3], 3),
+            ([ETimeFrames.SHORT, ETimeFrames.LONG], [EScope.S3], 2),
+        ]:
+            protocol = TargetProtocol(scopes=scopes, time_frames=time_frames)
+            data = protocol.process(copy.deepcopy(targets), [self.company_base])
+            self.assertEqual(len(data), cells)
+            self.assertTrue(data["time_frame"].isin(time_frames).all())
+            self.assertTrue(
+                protocol.target_data["time_frame"].isin(time_frames).all()
+            )
+
+            data["investment_value"] = 100
+            temp_score = TemperatureScore(time_frames=time_frames, scopes=scopes)
+            pd.testing.assert_frame_equal(
+                temp_score.calculate(data).reset_index(drop=True),
+                temp_score.calculate(grid.copy()).reset_index(drop=True),
+            )
+
 
     def test_power_sector_intensity_mapping(self):
         """
@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from SBTi.configs import TemperatureScoreConfig
+from SBTi.input_tables import (
+    InputTableCache,
+    RegressionModelIndex,
+    build_snapshot,
+    read_snapshot,
+)
+
+
+class TestInputTableCache(unittest.TestCase):
+    """
+    Test the process-wide cache of the parsed input tables.
+    """
+
+    def setUp(self) -> None:
+        """
+        Create an empty cache, so the tests don't depend on the process-wide one.
+        :return:
+        """
+        self.cache = InputTableCache()
+
+    def test_regression_model(self) -> None:
+        """
+        Test whether the cached regression model matches the file and is only parsed once.
+
+        :return:
+        """
+        path = TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY
+        expected = pd.read_excel(path, header=0)
+        expected = expected[expected[TemperatureScoreConfig.COLS.MODEL] == 4]
+
+        regression_model = self.cache.get_regression_model(path, 4)
+        pd.testing.assert_frame_equal(regression_model, expected)
+        self.assertEqual(len(self.cache._tables), 2)
+
+        self.cache.get_regression_model(path, 4)
+        self.cache.get_regression_model(path, 5)
+        self.assertEqual(len(self.cache._tables), 3)
+
+    def test_invalidate(self) -> None:
+        """
+        Test whether invalidating a file removes all tables that were parsed from it.
+
+        :return:
+        """
+        self.cache.get_regression_model(
+            TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY, 4
+        )
+        self.cache.get_sr15_mapping(TemperatureScoreConfig.FILE_SR15_MAPPING)
+        self.cache.invalidate(TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY)
+        self.assertEqual(len(self.cache._tables), 1)
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache._tables), 0)
+
+    def test_isolation(self) -> None:
+        """
+        Test whether changing a table that was handed out by the cache doesn't change the table for the next caller.
+
+        :return:
+        """
+        path = TemperatureScoreConfig.FILE_SR15_MAPPING
+        column = "SR15_variable"
+        expected = self.cache.get_sr15_mapping(path)[column].copy()
+
+        mapping = self.cache.get_sr15_mapping(path)
+        mapping.loc[0, column] = "changed"
+        try:
+            mapping[column].values[1] = "changed"
+        except ValueError:
+            # The array is read-only under Copy-on-Write
+            pass
+        pd.testing.assert_series_equal(self.cache.get_sr15_mapping(path)[column], expected)
+
+        index = self.cache.get_regression_index(
+            TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY, 4
+        )
+        with self.assertRaises(ValueError):
+            index.positions[0, 0] = -1
+
+    def test_stale_entries(self) -> None:
+        """
+        Test whether the tables of an older version of a file are dropped once the file changes.
+
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sr15_mapping.xlsx")
+            shutil.copyfile(TemperatureScoreConfig.FILE_SR15_MAPPING, path)
+            self.cache.get_sr15_mapping(path)
+            modified = os.path.getmtime(path) + 10
+            os.utime(path, (modified, modified))
+            self.cache.get_sr15_mapping(path)
+            self.assertEqual(
+                [
+                    key[1]
+                    for key in self.cache._tables
+                    if key[0] == os.path.realpath(path)
+                ],
+                [modified],
+            )
+
+    def test_snapshot(self) -> None:
+        """
+        Test whether a snapshot contains the same table as the Excel file and is ignored once the Excel file changes.
+
+        :return:
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sr15_mapping.xlsx")
+            shutil.copyfile(TemperatureScoreConfig.FILE_SR15_MAPPING, path)
+            self.assertIsNone(read_snapshot(path))
+
+            build_snapshot(path)
+            pd.testing.assert_frame_equal(
+                read_snapshot(path), pd.read_excel(path, header=0), check_exact=True
+            )
+
+            shutil.copyfile(TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY, path)
+            self.assertIsNone(read_snapshot(path))
+
+    def test_regression_index(self) -> None:
+        """
+        Test whether the regression model index points at the right regression parameters.
+
+        :return:
+        """
+        regression_model = self.cache.get_regression_model(
+            TemperatureScoreConfig.FILE_REGRESSION_MODEL_SUMMARY, 4
+        )
+        index = RegressionModelIndex(regression_model)
+        positions = index.get_positions(
+            pd.Series(["Emissions|Kyoto Gases", "Emissions|Kyoto Gases", None]),
+            pd.Series(["slope5", "unknown", "slope5"]),
+        )
+        self.assertEqual(list(positions[1:]), [-1, -1])
+        row = regression_model.iloc[positions[0]]
+        self.assertEqual(row[TemperatureScoreConfig.COLS.VARIABLE], "Emissions|Kyoto Gases")
+        self.assertEqual(row[TemperatureScoreConfig.COLS.SLOPE], "slope5")
+
+        with self.assertRaises(ValueError):
+            RegressionModelIndex(pd.concat([regression_model, regression_model]))
+
+
+if __name__ == "__main__":
+    test = TestInputTableCache()
+    test.setUp()
+    test.test_regression_model()
+    test.test_invalidate()
+    test.test_isolation()
+    test.test_stale_entries()
+    test.test_snapshot()
+    test.test_regression_index()
@@ -3,6 +3,7 @@ import unittest
 
 import pandas as pd
 
+from SBTi.interfaces import EScope
 from SBTi.portfolio_aggregation import PortfolioAggregationMethod
 from SBTi.portfolio_coverage_tvp import PortfolioCoverageTVP
 
@@ -39,6 +40,134 @@ class TestPortfolioCoverageTVP(unittest.TestCase):
             coverage, 32.0663, places=4, msg="The portfolio coverage was not correct"
         )
 
+    def test_coverage_panel(self) -> None:
+        """
+        Test whether the coverage of a holdings panel is the same as the coverage of each holdings date separately.
+
+        :return:
+        """
+        company_data = {
+            pd.Timestamp("2023-12-31"): self.data,
+            pd.Timestamp("2024-06-30"): self.data.assign(
+                sbti_validated=1 - self.data["sbti_validated"]
+            ),
+        }
+        company_ids = self.data["company_id"].dropna()
+        holdings = pd.DataFrame(
+            {
+                pd.Timestamp("2024-01-31"): self.data["investment_value"].iloc[
+                    company_ids.index
+                ].to_numpy(),
+                pd.Timestamp("2024-07-31"): [0, 100.0],
+                pd.Timestamp("2024-08-31"): [0, 0],
+            },
+            index=company_ids.to_numpy(),
+        )
+        coverage = self.portfolio_coverage_tvp.get_portfolio_coverage_panel(
+            company_data, holdings, PortfolioAggregationMethod.WATS
+        )
+        self.assertEqual(
+            coverage.iloc[0],
+            self.portfolio_coverage_tvp.get_portfolio_coverage(
+                self.data.iloc[company_ids.index].copy(),
+                PortfolioAggregationMethod.WATS,
+            ),
+        )
+        self.assertEqual(coverage.iloc[1], 100.0)
+        self.assertTrue(pd.isnull(coverage.iloc[2]))
+
+    def test_coverages(self) -> None:
+        """
+        Test whether the coverages of a number of portfolios, methods and groups are the same as the coverages of each
+        of them separately.
+
+        :return:
+        """
+        company_data = self.data.assign(
+            company_id=self.data["company_id"].fillna("Capitas"),
+            scope=EScope.S1S2,
+            sector=["A", "B", "A"],
+        )
+        holdings = pd.DataFrame(
+            {
+                "portfolio_id": ["fund 1"] * 3 + ["fund 2"] * 2,
+                "company_id": list(company_data["company_id"])
+                + list(company_data["company_id"].iloc[[0, 2]]),
+                "investment_value": [10.0, 20.0, 30.0, 40.0, 50.0],
+            }
+        )
+        aggregation_methods = [
+            PortfolioAggregationMethod.WATS,
+            PortfolioAggregationMethod.TETS,
+            PortfolioAggregationMethod.MOTS,
+        ]
+        coverages = self.portfolio_coverage_tvp.get_portfolio_coverages(
+            company_data, holdings, aggregation_methods, grouping=["sector"]
+        )
+        self.assertEqual(
+            list(zip(coverages["portfolio_id"], coverages["group"])),
+            [
+                ("fund 1", None),
+                ("fund 1", "A"),
+                ("fund 1", "B"),
+                ("fund 2", None),
+                ("fund 2", "A"),
+            ],
+        )
+
+        for _, coverage in coverages.iterrows():
+            portfolio = holdings[holdings["portfolio_id"] == coverage["portfolio_id"]]
+            data = pd.merge(
+                company_data.drop(columns=["investment_value"]),
+                portfolio.drop(columns=["portfolio_id"]),
+                on="company_id",
+            )
+            if coverage["group"] is not None:
+                data = data[data["sector"] == coverage["group"]]
+            for aggregation_method in aggregation_methods:
+                self.assertEqual(
+                    coverage[aggregation_method.value],
+                    self.portfolio_coverage_tvp.get_portfolio_coverage(
+                        data.copy(), aggregation_method
+                    ),
+                )
+
+    def test_coverage_history(self) -> None:
+        """
+        Test whether the coverage history of a SBTi validity matrix is the same as the coverage at each date separately.
+
+        :return:
+        """
+        company_data = self.data.assign(
+            company_id=self.data["company_id"].fillna("Capitas"), scope=EScope.S1S2
+        )
+        cutoff_dates = pd.to_datetime(["2020-12-31", "2021-12-31", "2022-12-31"])
+        sbti_validity = pd.DataFrame(
+            [[False, True, True], [False, False, True], [True, True, True]],
+            index=company_data["company_id"],
+            columns=cutoff_dates,
+        )
+        for aggregation_method in [
+            PortfolioAggregationMethod.WATS,
+            PortfolioAggregationMethod.TETS,
+            PortfolioAggregationMethod.MOTS,
+        ]:
+            coverage = self.portfolio_coverage_tvp.get_portfolio_coverage_history(
+                company_data, sbti_validity, aggregation_method
+            )
+            self.assertEqual(
+                list(coverage),
+                [
+                    self.portfolio_coverage_tvp.get_portfolio_coverage(
+                        company_data.assign(
+                            sbti_validated=sbti_validity[cutoff_date].to_numpy()
+                        ),
+                        aggregation_method,
+                    )
+                    for cutoff_date in cutoff_dates
+                ],
+            )
+
 
 if __name__ == "__main__":
     test = TestPortfolioCoverageTVP()
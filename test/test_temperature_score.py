@@ -1,3 +1,4 @@
+import functools
 import os
 import unittest
 
@@ -5,8 +6,16 @@ import pandas as pd
 
 from SBTi.configs import ColumnsConfig
 from SBTi.interfaces import ETimeFrames, EScope
-from SBTi.temperature_score import TemperatureScore
-from SBTi.portfolio_aggregation import PortfolioAggregationMethod
+from SBTi.temperature_score import (
+    EngagementType,
+    Scenario,
+    ScenarioType,
+    TemperatureScore,
+)
+from SBTi.portfolio_aggregation import (
+    PartialScoreAggregations,
+    PortfolioAggregationMethod,
+)
 
 
 class TestTemperatureScore(unittest.TestCase):
@@ -41,6 +50,15 @@ class TestTemperatureScore(unittest.TestCase):
             time_frame_map
         )
 
+    def _set_unique_investment_values(self) -> None:
+        """
+        Give each company a different investment value, so no two companies contribute the same to an aggregation.
+        """
+        companies = self.data[ColumnsConfig.COMPANY_ID].unique()
+        self.data[ColumnsConfig.INVESTMENT_VALUE] = self.data[
+            ColumnsConfig.COMPANY_ID
+        ].map(dict(zip(companies, range(1000, 1000 + len(companies)))))
+
     def test_temp_score(self) -> None:
         """
         Test whether the temperature score is calculated as expected.
@@ -87,6 +105,508 @@ class TestTemperatureScore(unittest.TestCase):
             msg="The aggregated fallback temp score was incorrect",
         )
 
+    def test_vectorized_scores(self) -> None:
+        """
+        Test whether the column-wise scoring gives the same results as the row-wise reference implementation.
+
+        :return:
+        """
+        reference = TemperatureScore(
+            time_frames=list(ETimeFrames),
+            scopes=EScope.get_result_scopes(),
+            vectorized=False,
+        )
+        pd.testing.assert_frame_equal(
+            self.temperature_score._prepare_data(self.data.copy()),
+            reference._prepare_data(self.data.copy()),
+            check_exact=True,
+        )
+
+    def test_vectorized_company_scores(self) -> None:
+        """
+        Test whether the column-wise S1+S2+S3 aggregation gives the same results as get_ghc_temperature_score.
+
+        :return:
+        """
+        reference = TemperatureScore(
+            time_frames=list(ETimeFrames),
+            scopes=EScope.get_result_scopes(),
+            vectorized=False,
+        )
+        pd.testing.assert_frame_equal(
+            self.temperature_score.calculate(self.data.copy()),
+            reference.calculate(self.data.copy()),
+            check_exact=True,
+        )
+
+    def test_calculate_scenarios(self) -> None:
+        """
+        Test whether calculating multiple scenarios at once gives the same results as calculating them one by one.
+
+        :return:
+        """
+        scenarios = [None]
+        # The highest contributor scenarios need engagement targets, which aren't in the test data
+        for scenario_type in [ScenarioType.TARGETS, ScenarioType.APPROVED_TARGETS]:
+            scenario = Scenario()
+            scenario.scenario_type = scenario_type
+            scenario.engagement_type = EngagementType.SET_TARGETS
+            scenarios.append(scenario)
+
+        results = self.temperature_score.calculate_scenarios(scenarios, self.data.copy())
+        self.assertEqual(len(results), len(scenarios))
+        for scenario, (scores, aggregations) in zip(scenarios, results):
+            temperature_score = TemperatureScore(
+                time_frames=list(ETimeFrames),
+                scopes=EScope.get_result_scopes(),
+                scenario=scenario,
+            )
+            expected = temperature_score.calculate(self.data.copy())
+            pd.testing.assert_frame_equal(scores, expected, check_exact=True)
+            self.assertEqual(
+                aggregations.model_dump(),
+                temperature_score.aggregate_scores(expected).model_dump(),
+            )
+
+    def test_calculate_models(self) -> None:
+        """
+        Test whether calculating multiple regression models at once gives the same results as calculating them one by
+        one.
+
+        :return:
+        """
+        scores = self.temperature_score.calculate_models([4, 5], self.data.copy())
+        self.assertEqual(list(scores[ColumnsConfig.MODEL].unique()), [4, 5])
+        for model in [4, 5]:
+            temperature_score = TemperatureScore(
+                time_frames=list(ETimeFrames),
+                scopes=EScope.get_result_scopes(),
+                model=model,
+            )
+            expected = temperature_score.calculate(self.data.copy())
+            expected[ColumnsConfig.MODEL] = model
+            pd.testing.assert_frame_equal(
+                scores[scores[ColumnsConfig.MODEL] == model].reset_index(drop=True),
+                expected.reset_index(drop=True),
+                check_exact=True,
+            )
+
+    def test_highest_contributors(self) -> None:
+        """
+        Test whether capping the highest contributors column-wise gives the same results as the reference
+        implementation, which builds the aggregations first.
+
+        :return:
+        """
+        # Make sure there are no ties between the contributions, as those are ranked on the company ID
+        self._set_unique_investment_values()
+
+        scenario = Scenario()
+        scenario.scenario_type = ScenarioType.HIGHEST_CONTRIBUTORS
+        scenario.engagement_type = EngagementType.SET_TARGETS
+        scores = []
+        for vectorized in [True, False]:
+            temperature_score = TemperatureScore(
+                time_frames=list(ETimeFrames),
+                scopes=EScope.get_result_scopes(),
+                scenario=scenario,
+                vectorized=vectorized,
+            )
+            scores.append(temperature_score.calculate(self.data.copy()))
+        pd.testing.assert_frame_equal(scores[0], scores[1], check_exact=True)
+
+    def test_vectorized_aggregations(self) -> None:
+        """
+        Test whether aggregating all time frames, scopes and groups in one pass gives the same results as the
+        reference implementation. Companies that contribute the same are kept in data order, so make sure there are no
+        ties.
+
+        :return:
+        """
+        self._set_unique_investment_values()
+        scores = self.temperature_score.calculate(self.data)
+        # The test data doesn't contain the revenues that are needed for ROTS
+        for aggregation_method in list(PortfolioAggregationMethod)[:-1]:
+            aggregations = []
+            for vectorized in [True, False]:
+                temperature_score = TemperatureScore(
+                    time_frames=list(ETimeFrames),
+                    scopes=EScope.get_result_scopes(),
+                    aggregation_method=aggregation_method,
+                    grouping=[ColumnsConfig.COMPANY_ISIC],
+                    vectorized=vectorized,
+                )
+                aggregations.append(
+                    temperature_score.aggregate_scores(scores.copy()).model_dump()
+                )
+            self.assertEqual(
+                str(aggregations[0]), str(aggregations[1]), aggregation_method
+            )
+
+    def test_columnar_aggregations(self) -> None:
+        """
+        Test whether the columnar aggregations can be navigated like the pydantic models and serialize to the same
+        result.
+
+        :return:
+        """
+        self.temperature_score.grouping = [ColumnsConfig.COMPANY_ISIC]
+        scores = self.temperature_score.calculate(self.data)
+        aggregations = self.temperature_score.aggregate_scores(scores)
+        columnar = self.temperature_score.aggregate_scores(scores, columnar=True)
+
+        self.assertEqual(columnar.model_dump(), aggregations.model_dump())
+        self.assertEqual(
+            columnar["mid"]["S1S2"]["all"]["score"], aggregations.mid.S1S2.all.score
+        )
+        self.assertEqual(
+            columnar.mid.S1S2S3.influence_percentage,
+            aggregations.mid.S1S2S3.influence_percentage,
+        )
+        self.assertEqual(
+            list(columnar.short.S3.grouped), list(aggregations.short.S3.grouped)
+        )
+        contributions = columnar.long.S1S2.all.contributions
+        self.assertIsInstance(contributions, pd.DataFrame)
+        self.assertEqual(
+            list(contributions[ColumnsConfig.COMPANY_NAME]),
+            [
+                contribution.company_name
+                for contribution in aggregations.long.S1S2.all.contributions
+            ],
+        )
+
+    def test_aggregate_scores_per_method(self) -> None:
+        """
+        Test whether aggregating with multiple methods at once gives the same results as aggregating them one by one.
+
+        :return:
+        """
+        self.temperature_score.grouping = [ColumnsConfig.COMPANY_ISIC]
+        scores = self.temperature_score.calculate(self.data)
+        # The test data doesn't contain the revenues that are needed for ROTS
+        aggregation_methods = list(PortfolioAggregationMethod)[:-1]
+        aggregations = self.temperature_score.aggregate_scores_per_method(
+            scores, aggregation_methods
+        )
+        self.assertEqual(list(aggregations), aggregation_methods)
+        for aggregation_method in aggregation_methods:
+            self.temperature_score.aggregation_method = aggregation_method
+            self.assertEqual(
+                aggregations[aggregation_method].model_dump(),
+                self.temperature_score.aggregate_scores(scores).model_dump(),
+            )
+
+        with self.assertRaises(KeyError):
+            self.temperature_score.aggregate_scores_per_method(
+                scores, list(PortfolioAggregationMethod)
+            )
+
+    def test_top_contributors(self) -> None:
+        """
+        Test whether keeping only the top contributors gives the first contributions of the full aggregations, followed
+        by the sum of the other companies.
+
+        :return:
+        """
+        self.temperature_score.grouping = [ColumnsConfig.COMPANY_ISIC]
+        scores = self.temperature_score.calculate(self.data)
+        aggregations = self.temperature_score.aggregate_scores(scores, columnar=True)
+        top_aggregations = self.temperature_score.aggregate_scores(
+            scores, columnar=True, top_contributors=3
+        )
+
+        contributions = aggregations.long.S1S2.all.contributions.reset_index(drop=True)
+        top_contributions = top_aggregations.long.S1S2.all.contributions.reset_index(
+            drop=True
+        )
+        self.assertEqual(
+            top_aggregations.long.S1S2.all.score, aggregations.long.S1S2.all.score
+        )
+        self.assertEqual(len(top_contributions), 4)
+        pd.testing.assert_frame_equal(top_contributions.iloc[:3], contributions.iloc[:3])
+        other = top_contributions.iloc[3]
+        self.assertEqual(other[ColumnsConfig.COMPANY_NAME], "Other")
+        self.assertTrue(pd.isnull(other[ColumnsConfig.COMPANY_ID]))
+        self.assertAlmostEqual(
+            other[ColumnsConfig.CONTRIBUTION],
+            contributions[ColumnsConfig.CONTRIBUTION].iloc[3:].sum(),
+        )
+        self.assertAlmostEqual(
+            other[ColumnsConfig.CONTRIBUTION_RELATIVE],
+            contributions[ColumnsConfig.CONTRIBUTION_RELATIVE].iloc[3:].sum(),
+        )
+
+        # Aggregations with no more companies than the top contributors are kept as they are
+        self.assertEqual(
+            self.temperature_score.aggregate_scores(
+                scores, top_contributors=len(scores)
+            ).model_dump(),
+            aggregations.model_dump(),
+        )
+
+        model = self.temperature_score.aggregate_scores(scores, top_contributors=3)
+        self.assertEqual(model.long.S1S2.all.contributions[-1].company_name, "Other")
+        self.assertIsNone(model.long.S1S2.all.contributions[-1].company_id)
+
+        # The other companies are left out if they have no weight
+        self.temperature_score.grouping = []
+        companies = scores[ColumnsConfig.COMPANY_ID].unique()
+        scores.loc[
+            ~scores[ColumnsConfig.COMPANY_ID].isin(companies[:3]),
+            ColumnsConfig.INVESTMENT_VALUE,
+        ] = 0
+        model = self.temperature_score.aggregate_scores(scores, top_contributors=3)
+        self.assertEqual(
+            sorted(
+                contribution.company_id
+                for contribution in model.long.S1S2.all.contributions
+            ),
+            sorted(companies[:3]),
+        )
+        self.assertNotIn("NaN", model.model_dump_json())
+        with self.assertRaises(ValueError):
+            self.temperature_score.aggregate_scores(scores, top_contributors=-1)
+
+    def test_partial_aggregations(self) -> None:
+        """
+        Test whether merging the partial aggregations of a number of shards gives the same results as aggregating the
+        whole portfolio at once.
+
+        :return:
+        """
+        self.temperature_score.grouping = [ColumnsConfig.COMPANY_ISIC]
+        scores = self.temperature_score.calculate(self.data)
+        aggregation_methods = list(PortfolioAggregationMethod)[:-1]
+        aggregations = self.temperature_score.aggregate_scores_per_method(
+            scores, aggregation_methods
+        )
+
+        partial_aggregations = self.temperature_score.partial_aggregate_scores(
+            scores, aggregation_methods
+        ).finalize()
+        for aggregation_method in aggregation_methods:
+            self.assertEqual(
+                partial_aggregations[aggregation_method].model_dump(),
+                aggregations[aggregation_method].model_dump(),
+            )
+
+        shards = scores[ColumnsConfig.COMPANY_ID].factorize()[0] % 3
+        partial_aggregations = [
+            self.temperature_score.partial_aggregate_scores(
+                scores[shards == shard], aggregation_methods
+            )
+            for shard in range(3)
+        ]
+        # Merge from the right here and from the left below, as the order of merging doesn't matter
+        merged_aggregations = (
+            partial_aggregations[0]
+            .merge(partial_aggregations[1].merge(partial_aggregations[2]))
+            .finalize(columnar=True)
+        )
+        for aggregation_method in aggregation_methods:
+            for time_frame in self.temperature_score.time_frames:
+                for scope in self.temperature_score.scopes:
+                    expected = getattr(aggregations[aggregation_method], time_frame.value)
+                    expected = getattr(expected, scope.name)
+                    merged = merged_aggregations[aggregation_method].get(time_frame, scope)
+                    self.assertAlmostEqual(merged.all.score, expected.all.score)
+                    self.assertEqual(sorted(merged.grouped), sorted(expected.grouped))
+                    for group, aggregation in expected.grouped.items():
+                        self.assertAlmostEqual(
+                            merged.grouped[group].score, aggregation.score
+                        )
+
+        with self.assertRaises(ValueError):
+            partial_aggregations[0].merge(
+                self.temperature_score.partial_aggregate_scores(
+                    scores, [PortfolioAggregationMethod.WATS]
+                )
+            )
+
+        # Without contributions, only the sums per time frame, scope and group are kept
+        summed_aggregations = [
+            self.temperature_score.partial_aggregate_scores(
+                scores[shards == shard], aggregation_methods, contributions=False
+            )
+            for shard in range(3)
+        ]
+        merged = functools.reduce(PartialScoreAggregations.merge, summed_aggregations)
+        cells = [ColumnsConfig.TIME_FRAME, ColumnsConfig.SCOPE, ColumnsConfig.COMPANY_ISIC]
+        self.assertEqual(len(merged.rows), len(scores[cells].drop_duplicates()))
+        merged_aggregations = merged.finalize()
+        for aggregation_method in aggregation_methods:
+            for time_frame in self.temperature_score.time_frames:
+                for scope in self.temperature_score.scopes:
+                    expected = getattr(aggregations[aggregation_method], time_frame.value)
+                    expected = getattr(expected, scope.name)
+                    summed = getattr(merged_aggregations[aggregation_method], time_frame.value)
+                    summed = getattr(summed, scope.name)
+                    self.assertAlmostEqual(summed.all.score, expected.all.score)
+                    self.assertAlmostEqual(
+                        summed.influence_percentage, expected.influence_percentage
+                    )
+                    self.assertEqual(summed.all.contributions, [])
+                    for group, aggregation in expected.grouped.items():
+                        self.assertAlmostEqual(
+                            summed.grouped[group].score, aggregation.score
+                        )
+                        self.assertEqual(
+                            summed.grouped[group].proportion, aggregation.proportion
+                        )
+
+        with self.assertRaises(ValueError):
+            partial_aggregations[0].merge(summed_aggregations[0])
+
+    def test_aggregate_holdings(self) -> None:
+        """
+        Test whether aggregating holdings that are streamed in chunks of lots gives the same results as aggregating the
+        portfolio at once.
+
+        :return:
+        """
+        self._set_unique_investment_values()
+        self.temperature_score.grouping = [ColumnsConfig.COMPANY_ISIC]
+        scores = self.temperature_score.calculate(self.data)
+        holdings = scores[
+            [
+                ColumnsConfig.COMPANY_ID,
+                ColumnsConfig.INVESTMENT_VALUE,
+                ColumnsConfig.COMPANY_ISIC,
+            ]
+        ].drop_duplicates(ColumnsConfig.COMPANY_ID)
+        # Split every holding into two lots, that end up in different chunks
+        lots = pd.concat(
+            [
+                holdings.assign(
+                    investment_value=holdings[ColumnsConfig.INVESTMENT_VALUE] / 2
+                )
+            ]
+            * 2
+        ).sample(frac=1, random_state=0)
+        chunks = [lots.iloc[i : i + 5] for i in range(0, len(lots), 5)]
+
+        for aggregation_method in list(PortfolioAggregationMethod)[:-1]:
+            self.temperature_score.aggregation_method = aggregation_method
+            self.assertEqual(
+                self.temperature_score.aggregate_holdings(scores, chunks).model_dump(),
+                self.temperature_score.aggregate_scores(scores).model_dump(),
+            )
+
+        with self.assertRaises(ValueError):
+            self.temperature_score.aggregate_holdings(
+                scores, [lots.drop(columns=[ColumnsConfig.COMPANY_ISIC])]
+            )
+
+    def test_look_through(self) -> None:
+        """
+        Test whether a fund-of-funds is aggregated on its look-through holdings.
+
+        :return:
+        """
+        scores = self.temperature_score.calculate(self.data)
+        company_ids = list(scores[ColumnsConfig.COMPANY_ID].unique())
+        holdings = pd.DataFrame(
+            {
+                ColumnsConfig.PORTFOLIO_ID: ["A", "A", "B", "B", "P"],
+                ColumnsConfig.COMPANY_ID: company_ids[:2] + company_ids[1:4],
+                ColumnsConfig.INVESTMENT_VALUE: [10.0, 20.0, 40.0, 80.0, 100.0],
+            }
+        )
+        hierarchy = pd.DataFrame(
+            {
+                ColumnsConfig.PARENT_PORTFOLIO_ID: ["P", "P", "Q"],
+                ColumnsConfig.CHILD_PORTFOLIO_ID: ["A", "B", "P"],
+                ColumnsConfig.HIERARCHY_WEIGHT: [0.5, 0.25, 0.1],
+            }
+        )
+        aggregations = self.temperature_score.aggregate_portfolios(
+            scores, holdings, hierarchy=hierarchy
+        )
+        self.assertEqual(list(aggregations), ["A", "B", "P", "Q"])
+
+        # Q holds 10% of P, which holds 50% of A and 25% of B
+        look_through_holdings = pd.DataFrame(
+            {
+                ColumnsConfig.COMPANY_ID: company_ids[:4],
+                ColumnsConfig.INVESTMENT_VALUE: [0.5, 2.0, 2.0, 10.0],
+            }
+        )
+        data = pd.merge(
+            scores.drop(columns=[ColumnsConfig.INVESTMENT_VALUE]),
+            look_through_holdings,
+            on=ColumnsConfig.COMPANY_ID,
+        )
+        expected = self.temperature_score.aggregate_scores(data)
+        for time_frame in self.temperature_score.time_frames:
+            for scope in self.temperature_score.scopes:
+                self.assertAlmostEqual(
+                    aggregations["Q"][time_frame.value][scope.name].all.score,
+                    expected[time_frame.value][scope.name].all.score,
+                )
+
+        hierarchy.loc[len(hierarchy)] = ["A", "Q", 1.0]
+        with self.assertRaises(ValueError):
+            self.temperature_score.aggregate_portfolios(
+                scores, holdings, hierarchy=hierarchy
+            )
+
+    def test_aggregate_panel(self) -> None:
+        """
+        Test whether aggregating a holdings panel gives the same scores as aggregating each holdings date separately,
+        with the scores of the latest reporting date.
+
+        :return:
+        """
+        reporting_dates = [pd.Timestamp("2023-12-31"), pd.Timestamp("2024-06-30")]
+        scores = {
+            reporting_dates[0]: self.temperature_score.calculate(self.data),
+            reporting_dates[1]: self.temperature_score.calculate(
+                self.data.assign(
+                    reduction_ambition=self.data[ColumnsConfig.REDUCTION_AMBITION] / 2
+                )
+            ),
+        }
+        company_ids = scores[reporting_dates[0]][ColumnsConfig.COMPANY_ID].unique()
+        holdings = pd.DataFrame(
+            {
+                pd.Timestamp("2024-01-31"): [
+                    100.0 * (i % 3) for i in range(len(company_ids))
+                ],
+                pd.Timestamp("2024-07-31"): [
+                    10.0 + i for i in range(len(company_ids))
+                ],
+            },
+            index=company_ids,
+        )
+
+        panel = self.temperature_score.aggregate_panel(scores, holdings)
+        self.assertEqual(list(panel.index), list(holdings.columns))
+        for holdings_date, reporting_date in zip(holdings.columns, reporting_dates):
+            investment_values = holdings[holdings_date][holdings[holdings_date] != 0]
+            data = pd.merge(
+                scores[reporting_date].drop(columns=[ColumnsConfig.INVESTMENT_VALUE]),
+                pd.DataFrame(
+                    {
+                        ColumnsConfig.COMPANY_ID: investment_values.index,
+                        ColumnsConfig.INVESTMENT_VALUE: investment_values.values,
+                    }
+                ),
+                on=ColumnsConfig.COMPANY_ID,
+            )
+            aggregations = self.temperature_score.aggregate_scores(data)
+            for time_frame in self.temperature_score.time_frames:
+                for scope in self.temperature_score.scopes:
+                    self.assertEqual(
+                        panel.loc[holdings_date, (time_frame.value, scope.name)],
+                        aggregations[time_frame.value][scope.name].all.score,
+                    )
+
+        with self.assertRaises(ValueError):
+            self.temperature_score.aggregate_panel(
+                {reporting_dates[1]: scores[reporting_dates[1]]}, holdings
+            )
+
     def test_portfolio_aggregations(self):
         scores = self.temperature_score.calculate(self.data)
         aggregations = self.temperature_score.aggregate_scores(scores)